@@ -0,0 +1,146 @@
+"""Throughput and memory benchmarks of CacheSimulator over synthetic workloads.
+
+run_benchmarks() times every mapping x replacement policy x cache size x workload
+combination and returns JSON-ready result rows; compare_results() flags the rows that
+got slower or hungrier than a stored baseline.
+"""
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from itertools import product
+
+from simulator import CacheSimulator, MAPPINGS, REPLACEMENT_POLICIES
+from workloads import WORKLOADS, generate
+
+BENCHMARK_VERSION = 1
+
+# 32 B to 8 MB in steps of 4x
+DEFAULT_CACHE_SIZES = [32 << (2 * step) for step in range(10)]
+DEFAULT_ACCESSES = 100000
+DEFAULT_MEMORY_SIZE = 1 << 32
+DEFAULT_BLOCK_SIZE = 16
+DEFAULT_ASSOCIATIVITY = 4
+DEFAULT_THRESHOLD = 0.1
+
+# Fields that identify a benchmark row across runs
+KEY_FIELDS = ("workload", "mapping", "replacement_policy", "cache_size", "block_size", "associativity")
+
+
+def bench_config(memory_size, cache_size, block_size, mapping, replacement_policy, associativity, addresses,
+                 repeat=1, memory=True, vectorized=True):
+    """Time one configuration over ``addresses``; the best of ``repeat`` runs counts.
+
+    With ``memory`` one more run is made under tracemalloc to measure the peak memory the
+    simulator allocates (tracing slows everything down, so it is never timed).
+    """
+    def simulator():
+        return CacheSimulator(memory_size, cache_size, block_size, mapping, replacement_policy,
+                              seed=0, history="off", associativity=associativity)
+
+    best = None
+    for _ in range(repeat):
+        cache = simulator()
+        start = time.perf_counter()
+        result = cache.run_trace(addresses, vectorized=vectorized)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak_memory = None
+    if memory:
+        tracemalloc.start()
+        try:
+            simulator().run_trace(addresses, vectorized=vectorized)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        "accesses": result.accesses,
+        "seconds": best,
+        "accesses_per_second": result.accesses / best if best > 0 else None,
+        "peak_memory": peak_memory,
+        "hit_rate": result.hit_rate,
+    }
+
+
+def run_benchmarks(workloads=WORKLOADS, mappings=MAPPINGS, replacement_policies=REPLACEMENT_POLICIES,
+                   cache_sizes=DEFAULT_CACHE_SIZES, accesses=DEFAULT_ACCESSES, memory_size=DEFAULT_MEMORY_SIZE,
+                   block_size=DEFAULT_BLOCK_SIZE, associativity=DEFAULT_ASSOCIATIVITY, repeat=1, memory=True,
+                   vectorized=True, seed=0, on_result=None):
+    """Benchmark the grid and return a JSON-ready report.
+
+    Caches smaller than a block use the cache size as block size, and the set associative
+    mapping never gets more ways than the cache has lines. ``vectorized`` false times the
+    per-address path even where a batch kernel exists. ``on_result(row)`` is called as each
+    row is done.
+    """
+    rows = []
+    for workload in workloads:
+        # Generated once up front, so generation never counts against the simulator
+        addresses = generate(workload, accesses, memory_size, seed)
+        for cache_size, mapping, replacement_policy in product(cache_sizes, mappings, replacement_policies):
+            block = min(block_size, cache_size)
+            ways = min(associativity, cache_size // block) if mapping == "Set Associative" else None
+            row = {
+                "workload": workload,
+                "mapping": mapping,
+                "replacement_policy": replacement_policy,
+                "cache_size": cache_size,
+                "block_size": block,
+                "associativity": ways,
+            }
+            row.update(bench_config(memory_size, cache_size, block, mapping, replacement_policy, ways or 1,
+                                    addresses, repeat, memory, vectorized))
+            rows.append(row)
+            if on_result is not None:
+                on_result(row)
+    return {
+        "version": BENCHMARK_VERSION,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "accesses": accesses,
+        "results": rows,
+    }
+
+
+def write_report(report, path):
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+
+
+def read_report(path):
+    with open(path) as file:
+        try:
+            report = json.load(file)
+        except json.JSONDecodeError:
+            raise ValueError(f"Not a benchmark report: {path}")
+    if not isinstance(report, dict) or report.get("version") != BENCHMARK_VERSION:
+        raise ValueError(f"Not a benchmark report: {path}")
+    return report
+
+
+def row_key(row):
+    return tuple(row[field] for field in KEY_FIELDS)
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return the regressions of report ``current`` against report ``baseline``.
+
+    A row regresses when its throughput dropped, or its peak memory grew, by more than
+    ``threshold`` (a fraction). Each regression is ``(row key, metric, baseline, current)``;
+    rows missing from either report are ignored.
+    """
+    baseline_rows = {row_key(row): row for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = baseline_rows.get(row_key(row))
+        if old is None:
+            continue
+        if old["accesses_per_second"] and row["accesses_per_second"] is not None \
+                and row["accesses_per_second"] < old["accesses_per_second"] * (1 - threshold):
+            regressions.append((row_key(row), "accesses_per_second", old["accesses_per_second"],
+                                row["accesses_per_second"]))
+        if old["peak_memory"] and row["peak_memory"] is not None \
+                and row["peak_memory"] > old["peak_memory"] * (1 + threshold):
+            regressions.append((row_key(row), "peak_memory", old["peak_memory"], row["peak_memory"]))
+    return regressions
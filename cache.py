@@ -1,140 +1,235 @@
-import random
+import threading
+import time
 
 from PyQt5.QtWidgets import QApplication, QHBoxLayout, QTableWidget, QTableWidgetItem, QWidget, QLabel, QPushButton, \
-    QVBoxLayout, QLineEdit, QTextEdit, QComboBox
-from collections import OrderedDict, Counter
-from PyQt5.QtCore import Qt
+    QVBoxLayout, QLineEdit, QTextEdit, QComboBox, QTableView, QHeaderView, QPlainTextEdit, QProgressBar, QSpinBox
+from collections import deque
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QThread, pyqtSignal
+from PyQt5.QtGui import QColor
 
 import sys
 
-class CacheSimulator:
-    def __init__(self, memory_size, cache_size, block_size, mapping, replacement_policy):
-        self.memory_size = memory_size
-        self.cache_size = cache_size
-        self.block_size = block_size
-        self.cache_size = min(memory_size, cache_size)
-        self.index_max = cache_size // block_size - 1
-        self.index_bits = len(bin(self.cache_size // self.block_size - 1)[2:])
-        self.offset_bits = len(bin(self.block_size - 1)[2:])
-        self.tag_bits = 32 - self.index_bits - self.offset_bits
-        self.mapping = mapping
-        self.replacement_policy = replacement_policy
-        self.cache = OrderedDict()
-        self.usage_count = Counter()
-        self.hits = 0
-        self.misses = 0
-        self.associativity = 2
-        self.evictions = 0
-        self.hit_instructions = []
-        self.miss_instructions = []
-        self.sample_text = ""
-        self.current_text = ""
-        self.current_index = 0
-        self.current_tag = 0
-
-    def hit(self, address, index, tag):
-        if self.replacement_policy == "LRU" or self.replacement_policy == "MRU":
-            self.cache.move_to_end(index)
-        else:
-            if self.replacement_policy == "LFU":
-                self.usage_count[index] += 1
-        self.hits += 1
-        self.current_text = f'{hex(address)}: {"Hit"}\n'
-        self.sample_text += f'{hex(address)}: {"Hit"}\n'
-        self.hit_instructions.append(address)
-
-    def miss(self, address, index, tag):
-        self.misses += 1
-        self.current_text = f'{hex(address)}: {"Miss"}\n'
-        self.sample_text += f'{hex(address)}: {"Miss"}\n'
-        self.miss_instructions.append(address)
-        if len(self.cache) >= self.cache_size // self.block_size:
-            self.evictions += 1
-            self.evict()
-        self.cache[index] = tag
-        self.usage_count[index] = 1
-
-    def access_memory_address(self, address):
-        self.get_index_and_tag(address)
-        index = self.current_index
-        tag = self.current_tag
-        if address < 0 or address >= self.memory_size:
-            raise ValueError(f"Invalid memory address: {hex(address)}")
-        if self.mapping == "Direct Mapping":
-            if index in self.cache and self.cache[index] == tag:
-                self.hit(address, index, tag)
-            else:
-                self.miss(address, index, tag)
-
-        elif self.mapping == "Fully Associative":
-            if tag in self.cache.values():
-                self.hits += 1
-                self.current_text = f'{hex(address)}: {"Hit"}\n'
-                self.sample_text += f'{hex(address)}: {"Hit"}\n'
-                self.hit_instructions.append(address)
-            else:
-                self.misses += 1
-                self.current_text = f'{hex(address)}: {"Miss"}\n'
-                self.sample_text += f'{hex(address)}: {"Miss"}\n'
-                self.miss_instructions.append(address)
-                if len(self.cache) >= self.cache_size // self.block_size:
-                    self.evictions += 1
-                    self.evict()
-                    index = self.find_unused_index()
-                self.cache[index] = tag
-
-    def find_unused_index(self):
-        all_indices = set(range(self.cache_size // self.block_size))
-        used_indices = set(self.cache.keys())
-        unused_indices = all_indices - used_indices
-        return min(unused_indices) if unused_indices else None
-
-    def evict(self):
-        """Evict one item from the cache based on the selected replacement policy."""
-        if not self.cache:
-            raise ValueError("Cache is empty, cannot evict.")
-        if self.replacement_policy == "LRU":
-            self.cache.popitem(last=False)
-        elif self.replacement_policy == "FIFO":
-            self.cache.popitem(last=False)
-        elif self.replacement_policy == "RANDOM":
-            random_key = random.choice(list(self.cache.keys()))
-            del self.cache[random_key]
-        elif self.replacement_policy == "LFU":
-            lfu_key = min(self.usage_count, key=self.usage_count.get)
-            del self.cache[lfu_key]
-            del self.usage_count[lfu_key]
-        elif self.replacement_policy == "MRU":
-            self.cache.popitem(last=True)
+from checkpoint import Timeline
+from instrumentation import MISS_KINDS, ConflictHeatmap, set_of_line
+# The engine lives in simulator.py; it is re-exported here for code that imports it from cache
+from simulator import CacheSimulator, MAPPINGS, REPLACEMENT_POLICIES, TraceResult
+from traces import load_addresses
+from workloads import WORKLOADS, Workload
+
+# Recent events kept by the GUI, both in the simulator and in the history box
+HISTORY_LINES = 1000
+
+# Longer generated workloads are summarised in the address field instead of listed
+GENERATED_ADDRESSES_SHOWN = 1000
+
+# Largest workload the GUI generates. It is built on the GUI thread and the Timeline keeps
+# about 33 bytes per access on top of the 8-byte address; longer traces belong to `cli.py run`.
+MAX_GENERATED_ADDRESSES = 1 << 22
+
+# Background runs repaint at most this often, each time with at most EVENTS_PER_UPDATE history lines
+UPDATES_PER_SECOND = 30
+EVENTS_PER_UPDATE = 250
+
+
+class CacheTableModel(QAbstractTableModel):
+    """Read-only view of a simulator's cache lines.
+
+    Cells are formatted only when the view asks for them, so only visible rows cost
+    anything, and refresh_line() repaints a single row after an access.
+    """
+
+    HEADERS = ["Index", "Valid", "Tag", "Data"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.simulator = None
+
+    def set_simulator(self, simulator):
+        self.beginResetModel()
+        self.simulator = simulator
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if self.simulator is None or parent.isValid():
+            return 0
+        return self.simulator.num_lines
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        line = index.row()
+        column = index.column()
+        if column == 0:
+            return str(line)
+        tag = self.simulator.line_tag(line)
+        if column == 1:
+            return "0" if tag is None else "1"  # Valid bit
+        if tag is None:
+            return "-" if column == 2 else "0"
+        if column == 2:
+            tag_bits = self.simulator.tag_bits
+            return bin(tag)[2:].zfill(tag_bits)[-tag_bits:]
+        offset_bits = self.simulator.offset_bits
+        return f"BLOCK {hex(self.simulator.block_address(line) >> 2)[2:]} WORD 0 - {(1 << offset_bits) - 1}"
+
+    def refresh_line(self, line):
+        if self.simulator is not None and 0 <= line < self.simulator.num_lines:
+            self.dataChanged.emit(self.index(line, 1), self.index(line, len(self.HEADERS) - 1))
+
+    def refresh_all(self):
+        # The view only repaints the rows it shows, however large the range
+        if self.simulator is not None and self.simulator.num_lines:
+            self.dataChanged.emit(self.index(0, 1), self.index(self.simulator.num_lines - 1, len(self.HEADERS) - 1))
+
+
+class ConflictHeatmapModel(QAbstractTableModel):
+    """Read-only view of an instrumentation.ConflictHeatmap, one row per set.
+
+    The conflict column is shaded from white to red by its share of the worst set's count.
+    Stepping back does not undo counts: they cover the furthest access the timeline reached.
+    """
+
+    HEADERS = ["Set", "Misses", "Conflicts"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.heatmap = None
+
+    def set_heatmap(self, heatmap):
+        self.beginResetModel()
+        self.heatmap = heatmap
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if self.heatmap is None or parent.isValid():
+            return 0
+        return len(self.heatmap.misses_per_set)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if not index.isValid():
+            return None
+        row = index.row()
+        column = index.column()
+        if role == Qt.BackgroundRole and column == 2:
+            peak = self.heatmap.peak_conflicts
+            heat = self.heatmap.conflicts_per_set[row] / peak if peak else 0
+            shade = int(255 * (1 - heat))
+            return QColor(255, shade, shade)
+        if role != Qt.DisplayRole:
+            return None
+        if column == 0:
+            return str(row)
+        if column == 1:
+            return str(self.heatmap.misses_per_set[row])
+        return str(self.heatmap.conflicts_per_set[row])
+
+    def refresh_row(self, row):
+        if self.heatmap is not None and 0 <= row < self.rowCount():
+            self.dataChanged.emit(self.index(row, 1), self.index(row, len(self.HEADERS) - 1))
+
+    def refresh_all(self):
+        # The shading is relative to the worst set, so a new peak recolours every row
+        if self.heatmap is not None and self.rowCount():
+            self.dataChanged.emit(self.index(0, 1), self.index(self.rowCount() - 1, len(self.HEADERS) - 1))
+
+
+class SimulationWorker(QObject):
+    """Steps a checkpoint.Timeline to the end of its address sequence on a background thread.
+
+    The worker never touches widgets: it reports through signals, batching everything that
+    happened since the last report so the GUI repaints at most UPDATES_PER_SECOND times.
+    ``rate`` limits the accesses per second; None runs as fast as possible.
+    """
+
+    # position reached, recent (address, hit, line) events, accesses per second
+    progress = pyqtSignal(int, list, float)
+    # position reached, whether the run was cancelled
+    finished = pyqtSignal(int, bool)
+    failed = pyqtSignal(str)
+
+    def __init__(self, timeline, rate=None):
+        super().__init__()
+        self.timeline = timeline
+        self.simulator = timeline.simulator
+        self.addresses = timeline.addresses
+        self.position = timeline.position
+        self.rate = rate
+        self.running = threading.Event()
+        self.running.set()
+        self.cancelled = threading.Event()
+
+    def pause(self):
+        self.running.clear()
+
+    def resume(self):
+        self.running.set()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.running.set()
+
+    def run(self):
+        step = self.timeline.step
+        simulator = self.simulator
+        events = deque(maxlen=EVENTS_PER_UPDATE)
+        interval = 1 / UPDATES_PER_SECOND
+        started = time.perf_counter()
+        start_position = self.position
+        next_update = started + interval
+        try:
+            while self.position < len(self.addresses) and not self.cancelled.is_set():
+                if not self.running.is_set():
+                    self.report(events, started, start_position)
+                    self.running.wait()
+                    # Time spent paused does not count against the rate or the throughput
+                    started = time.perf_counter()
+                    start_position = self.position
+                    continue
+                address = self.addresses[self.position]
+                hit = step()
+                self.position += 1
+                events.append((address, hit, simulator.current_index))
+                now = time.perf_counter()
+                if self.rate:
+                    delay = started + (self.position - start_position) / self.rate - now
+                    if delay > 0:
+                        self.cancelled.wait(delay)
+                        now = time.perf_counter()
+                if now >= next_update:
+                    self.report(events, started, start_position)
+                    next_update = now + interval
+        except ValueError as e:
+            self.report(events, started, start_position)
+            self.failed.emit(str(e))
         else:
-            raise ValueError(f"Unknown replacement policy: {self.replacement_policy}")
-
-    def evict_set(self, set_index):
-        """ Evict one item from a cache set based on the selected replacement policy """
-        if self.replacement_policy == "LRU":
-            self.cache[set_index].popitem(last=False)  # LRU eviction for sets
-        elif self.replacement_policy == "FIFO":
-            self.cache[set_index].popitem(last=False)  # FIFO eviction for sets
-        elif self.replacement_policy == "RANDOM":
-            random_key = random.choice(list(self.cache[set_index].keys()))  # Random eviction for sets
-            del self.cache[set_index][random_key]
-
-    def get_index_and_tag(self, address):
-        tag = 0
-        index = 0
-        if self.mapping == "Direct Mapping":
-            tag = address >> (self.index_bits + self.offset_bits)
-            index = (address >> self.offset_bits) & ((1 << self.index_bits) - 1)
-        elif self.mapping == "Fully Associative":
-            tag = address >> self.offset_bits
-            index = len(self.cache)
-            if index >= self.cache_size // self.block_size:
-                self.evictions += 1
-                self.evict()
-                index = self.find_unused_index()
-
-        self.current_index = index
-        self.current_tag = tag
+            self.report(events, started, start_position)
+        self.finished.emit(self.position, self.cancelled.is_set())
+
+    def report(self, events, started, start_position):
+        elapsed = time.perf_counter() - started
+        throughput = (self.position - start_position) / elapsed if elapsed > 0 else 0.0
+        self.progress.emit(self.position, list(events), throughput)
+        events.clear()
 
 
 class CacheSimulatorApp(QWidget):
@@ -144,6 +239,8 @@ class CacheSimulatorApp(QWidget):
         self.k = 0
         self.address_sequence = []
         self.cache_simulator = None
+        self.timeline = None
+        self.update_run_controls()
 
     def initUI(self):
         self.setWindowTitle('Cache Simulator')
@@ -164,13 +261,19 @@ class CacheSimulatorApp(QWidget):
 
         self.mapping_label = QLabel('Mapping Technique:')
         self.mapping_combobox = QComboBox()
-        self.mapping_combobox.addItems(["Direct Mapping", "Fully Associative"])
+        self.mapping_combobox.addItems(MAPPINGS)
 
         self.replacement_policy_label = QLabel('Replacement Policy:')
         self.replacement_policy_combobox = QComboBox()
-        self.replacement_policy_combobox.addItems(["LRU", "FIFO", "RANDOM", "LFU", "MRU"])
+        self.replacement_policy_combobox.addItems(REPLACEMENT_POLICIES)
         self.replacement_policy_combobox.setEnabled(False)
 
+        self.associativity_label = QLabel('Associativity (ways):')
+        self.associativity_input = QSpinBox()
+        self.associativity_input.setRange(1, 1 << 16)
+        self.associativity_input.setValue(2)
+        self.associativity_input.setEnabled(False)
+
         self.mapping_combobox.currentIndexChanged.connect(self.update_replacement_policy_status)
 
         self.address_label = QLabel('Memory Address Sequence:')
@@ -180,16 +283,27 @@ class CacheSimulatorApp(QWidget):
         self.simulate_button = QPushButton('Simulate')
         self.simulate_button.clicked.connect(self.simulate)
 
-        self.generate_button = QPushButton('Generate 10 Random Addresses')
-        self.generate_button.clicked.connect(self.generate_random_sequence)
+        self.workload_combobox = QComboBox()
+        self.workload_combobox.addItems(WORKLOADS)
+        self.workload_combobox.setCurrentText("uniform")
+        self.workload_count_input = QSpinBox()
+        self.workload_count_input.setRange(1, MAX_GENERATED_ADDRESSES)
+        self.workload_count_input.setValue(10)
+        self.generate_button = QPushButton('Generate')
+        self.generate_button.clicked.connect(self.generate_workload)
+        # Addresses of the latest generated workload, until the address field is edited
+        self.generated_sequence = None
+        self.address_input.textEdited.connect(self.discard_generated_sequence)
 
         self.result_label = QLabel('Simulation Result:')
         self.result_textbox = QTextEdit()
         self.result_textbox.setReadOnly(True)
 
         self.history_label = QLabel('History:')
-        self.history_textbox = QTextEdit()
+        # A plain text log with a block limit appends in constant time, unlike a rich QTextEdit
+        self.history_textbox = QPlainTextEdit()
         self.history_textbox.setReadOnly(True)
+        self.history_textbox.setMaximumBlockCount(HISTORY_LINES)
 
         self.hitMiss_label = QLabel('Hit / Miss:')
         self.hitMiss = QTextEdit('')
@@ -197,6 +311,29 @@ class CacheSimulatorApp(QWidget):
         self.next_button = QPushButton('Next')
         self.next_button.setEnabled(False)
         self.next_button.clicked.connect(self.step_simulation)
+        self.back_button = QPushButton('Back')
+        self.back_button.clicked.connect(lambda: self.seek(self.k - 1))
+        self.seek_input = QSpinBox()
+        self.seek_input.setRange(0, 0)
+        self.seek_button = QPushButton('Go to Step')
+        self.seek_button.clicked.connect(lambda: self.seek(self.seek_input.value()))
+
+        self.rate_label = QLabel('Play Rate (accesses/s):')
+        self.rate_input = QSpinBox()
+        self.rate_input.setRange(1, 1000000)
+        self.rate_input.setValue(10)
+        self.play_button = QPushButton('Play')
+        self.play_button.clicked.connect(lambda: self.start_worker(self.rate_input.value()))
+        self.run_button = QPushButton('Run to End')
+        self.run_button.clicked.connect(lambda: self.start_worker(None))
+        self.pause_button = QPushButton('Pause')
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.cancel_button = QPushButton('Cancel')
+        self.cancel_button.clicked.connect(self.cancel_worker)
+        self.progress_bar = QProgressBar()
+        self.throughput_label = QLabel('')
+        self.worker = None
+        self.worker_thread = None
 
         # Layout setup
         layout = QHBoxLayout()
@@ -213,12 +350,19 @@ class CacheSimulatorApp(QWidget):
         left_layout.addWidget(self.mapping_combobox)
         left_layout.addWidget(self.replacement_policy_label)
         left_layout.addWidget(self.replacement_policy_combobox)
+        left_layout.addWidget(self.associativity_label)
+        left_layout.addWidget(self.associativity_input)
         left_layout.addWidget(self.address_label)
         left_layout.addWidget(self.address_input)
 
+        generate_layout = QHBoxLayout()
+        generate_layout.addWidget(self.workload_combobox)
+        generate_layout.addWidget(self.workload_count_input)
+        generate_layout.addWidget(self.generate_button)
+        left_layout.addLayout(generate_layout)
+
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.simulate_button)
-        button_layout.addWidget(self.generate_button)
         left_layout.addLayout(button_layout)
 
         left_layout.addWidget(self.result_label)
@@ -226,15 +370,42 @@ class CacheSimulatorApp(QWidget):
         left_layout.addWidget(self.history_label)
         left_layout.addWidget(self.history_textbox)
 
-        left_layout.addWidget(self.next_button)
-
-        self.cache_table = QTableWidget()
-        self.cache_table.setColumnCount(4)
-        self.cache_table.setHorizontalHeaderLabels(["Index", "Valid", "Tag", "Data"])
+        step_layout = QHBoxLayout()
+        step_layout.addWidget(self.back_button)
+        step_layout.addWidget(self.next_button)
+        step_layout.addWidget(self.seek_input)
+        step_layout.addWidget(self.seek_button)
+        left_layout.addLayout(step_layout)
+
+        run_layout = QHBoxLayout()
+        run_layout.addWidget(self.rate_label)
+        run_layout.addWidget(self.rate_input)
+        left_layout.addLayout(run_layout)
+        run_buttons_layout = QHBoxLayout()
+        run_buttons_layout.addWidget(self.play_button)
+        run_buttons_layout.addWidget(self.run_button)
+        run_buttons_layout.addWidget(self.pause_button)
+        run_buttons_layout.addWidget(self.cancel_button)
+        left_layout.addLayout(run_buttons_layout)
+        left_layout.addWidget(self.progress_bar)
+        left_layout.addWidget(self.throughput_label)
+
+        self.cache_model = CacheTableModel(self)
+        self.cache_table = QTableView()
+        self.cache_table.setModel(self.cache_model)
         self.cache_table.verticalHeader().setVisible(False)
+        # Fixed row heights let the view skip measuring rows it does not show
+        self.cache_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.cache_table.setColumnWidth(2, 250)  # Wider Tag field
         self.cache_table.setColumnWidth(3, 250)  # Wider Data field
 
+        self.heatmap_model = ConflictHeatmapModel(self)
+        self.heatmap_table = QTableView()
+        self.heatmap_table.setModel(self.heatmap_model)
+        self.heatmap_table.verticalHeader().setVisible(False)
+        self.heatmap_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.heatmap = None
+
         self.instr_table = QTableWidget()
         self.instr_table.setColumnCount(3)
         self.instr_table.setHorizontalHeaderLabels(["Tag", "Index", "Offset"])
@@ -247,7 +418,10 @@ class CacheSimulatorApp(QWidget):
 
         table_layout = QVBoxLayout()
         table_layout.setAlignment(Qt.AlignCenter)
-        table_layout.addWidget(self.cache_table)
+        cache_layout = QHBoxLayout()
+        cache_layout.addWidget(self.cache_table, 3)
+        cache_layout.addWidget(self.heatmap_table, 1)
+        table_layout.addLayout(cache_layout)
         table_layout.addWidget(self.instr_table)
         table_layout.setSpacing(10)
         table_layout.setContentsMargins(10, 10, 10, 10)
@@ -267,7 +441,7 @@ class CacheSimulatorApp(QWidget):
                 color: #1b4f72;  /* Elegant dark blue for labels */
                 font-family: 'Segoe UI', Arial, sans-serif; /* Clean, modern font */
             }
-            QLineEdit, QTextEdit, QComboBox, QPushButton {
+            QLineEdit, QTextEdit, QPlainTextEdit, QComboBox, QSpinBox, QPushButton {
                 font-size: 14px;
                 padding: 8px;
                 border: 1px solid #dcdde1;  /* Subtle gray border for inputs */
@@ -287,14 +461,14 @@ class CacheSimulatorApp(QWidget):
                 background-color: #0056b3;  /* Darker blue on hover for feedback */
                 border: 1px solid #003f7f;  /* Even darker blue border on hover */
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: #fcfcfd;  /* Slightly off-white for text background */
                 border: 1px solid #dcdde1;
                 border-radius: 8px;
                 font-family: 'Segoe UI', Arial, sans-serif;
                 color: #1b4f72;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #ffffff;  /* White table background */
                 border: 1px solid #dcdde1;  /* Soft gray border for tables */
                 gridline-color: #ececec;  /* Subtle grid lines */
@@ -318,7 +492,7 @@ class CacheSimulatorApp(QWidget):
                 selection-background-color: #007bff;  /* Blue highlight for dropdown selection */
                 selection-color: white;  /* White text for selection */
             }
-            QLineEdit:focus, QTextEdit:focus, QComboBox:focus {
+            QLineEdit:focus, QTextEdit:focus, QPlainTextEdit:focus, QComboBox:focus {
                 border: 1px solid #007bff;  /* Blue border for focused inputs */
                 outline: none;
             }
@@ -329,13 +503,28 @@ class CacheSimulatorApp(QWidget):
             self.replacement_policy_combobox.setEnabled(False)
         else:
             self.replacement_policy_combobox.setEnabled(True)
+        self.associativity_input.setEnabled(self.mapping_combobox.currentText() == "Set Associative")
+
+    def generate_workload(self):
+        try:
+            workload = Workload(self.workload_combobox.currentText(), self.workload_count_input.value(),
+                                int(self.memory_size_input.text()))
+            # A compact array, built chunk by chunk, rather than a list of Python ints
+            self.generated_sequence = load_addresses(workload)
+        except ValueError as e:
+            self.result_textbox.setPlainText(str(e))
+            return
+        if len(self.generated_sequence) <= GENERATED_ADDRESSES_SHOWN:
+            self.address_input.setText(", ".join(map(str, self.generated_sequence)))
+        else:
+            self.address_input.setText(f"<{workload.name}: {len(workload):,} generated addresses>")
 
-    def generate_random_sequence(self):
-        memory_size = int(self.memory_size_input.text())
-        random_sequence = [random.randint(0, memory_size - 1) for _ in range(10)]
-        self.address_input.setText(", ".join(map(str, random_sequence)))
+    def discard_generated_sequence(self):
+        self.generated_sequence = None
 
     def simulate(self):
+        if self.worker is not None:
+            return
         try:
             # Initialize cache simulator parameters
             self.history_textbox.setPlainText("")
@@ -345,20 +534,31 @@ class CacheSimulatorApp(QWidget):
             block_size = int(self.block_size_input.text())
             mapping = self.mapping_combobox.currentText()
             replacement_policy = self.replacement_policy_combobox.currentText()
-            self.address_sequence = [int(addr.strip()) for addr in self.address_input.text().split(',')]
+            if self.generated_sequence is not None:
+                self.address_sequence = self.generated_sequence
+            else:
+                self.address_sequence = [int(addr.strip()) for addr in self.address_input.text().split(',')]
 
             # Validate inputs
             if memory_size <= 0 or cache_size <= 0 or block_size <= 0 or not self.address_sequence:
                 raise ValueError("All fields must be filled with positive values!")
 
             # Initialize cache simulator
-            self.cache_simulator = CacheSimulator(memory_size, cache_size, block_size, mapping, replacement_policy)
+            self.cache_simulator = CacheSimulator(memory_size, cache_size, block_size, mapping, replacement_policy,
+                                                  history="ring", history_size=HISTORY_LINES,
+                                                  associativity=self.associativity_input.value())
+            self.heatmap = self.cache_simulator.add_observer(ConflictHeatmap())
+            self.heatmap_peak = 0
+            self.timeline = Timeline(self.cache_simulator, self.address_sequence)
 
             # Setup UI for simulation
             self.create_cache_table()
             self.create_instr_table()
             self.next_button.setEnabled(True)
             self.k = 0  # Reset address sequence index
+            self.progress_bar.setRange(0, len(self.address_sequence))
+            self.seek_input.setRange(0, len(self.address_sequence))
+            self.throughput_label.setText('')
             self.result_textbox.clear()
             self.step_simulation()  # Start the simulation with the first address
         except ValueError as e:
@@ -367,35 +567,123 @@ class CacheSimulatorApp(QWidget):
     def step_simulation(self):
         if self.k < len(self.address_sequence):
             address = self.address_sequence[self.k]
-            self.k += 1
-            self.cache_simulator.access_memory_address(address)
+            hit = self.timeline.step()
+            self.k = self.timeline.position
 
             # Update UI with simulation results
-            self.update_cache_table()
+            self.update_cache_table(hit)
             self.update_instr_table(address)
-            self.update_result_textbox(address)
+            self.update_result_textbox(address, hit)
+            self.progress_bar.setValue(self.k)
+        else:
+            self.finish_simulation()
+        self.update_run_controls()
+
+    def seek(self, position):
+        """Jump to the state after ``position`` accesses, backward or forward."""
+        if self.worker is not None or self.timeline is None:
+            return
+        position = max(0, min(position, len(self.address_sequence)))
+        changed = self.timeline.seek(position)
+        self.k = self.timeline.position
+        for line in changed:
+            self.cache_model.refresh_line(line)
+        self.heatmap_model.refresh_all()
+        if self.k:
+            self.update_instr_table(self.address_sequence[self.k - 1])
+            self.cache_table.scrollTo(self.cache_model.index(self.cache_simulator.current_index, 0))
+        self.history_textbox.appendHtml(f'<span style="color: gray;">Moved to step {self.k}.</span>')
+        self.update_statistics()
+        self.progress_bar.setValue(self.k)
+        self.update_run_controls()
+
+    def finish_simulation(self):
+        self.next_button.setEnabled(False)
+        self.history_textbox.setStyleSheet("color: blue;")
+        self.history_textbox.appendHtml('<span style="color: blue;">Simulation Complete.</span>')
+
+    def update_run_controls(self):
+        running = self.worker is not None
+        remaining = self.cache_simulator is not None and self.k < len(self.address_sequence)
+        self.simulate_button.setEnabled(not running)
+        self.next_button.setEnabled(not running and remaining)
+        self.back_button.setEnabled(not running and self.k > 0)
+        self.seek_input.setEnabled(not running and self.timeline is not None)
+        self.seek_button.setEnabled(not running and self.timeline is not None)
+        self.play_button.setEnabled(not running and remaining)
+        self.run_button.setEnabled(not running and remaining)
+        self.pause_button.setEnabled(running)
+        self.cancel_button.setEnabled(running)
+        if not running:
+            self.pause_button.setText('Pause')
+
+    def start_worker(self, rate):
+        if self.worker is not None or self.timeline is None:
+            return
+        self.worker_thread = QThread(self)
+        self.worker = SimulationWorker(self.timeline, rate)
+        self.worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.on_worker_progress)
+        self.worker.failed.connect(self.result_textbox.setPlainText)
+        self.worker.finished.connect(self.on_worker_finished)
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker_thread.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+        self.update_run_controls()
+        self.worker_thread.start()
+
+    def toggle_pause(self):
+        if self.worker is None:
+            return
+        if self.worker.running.is_set():
+            self.worker.pause()
+            self.pause_button.setText('Resume')
         else:
-            self.next_button.setEnabled(False)
-            self.history_textbox.setStyleSheet("color: blue;")
-            self.history_textbox.append("Simulation Complete.")
+            self.worker.resume()
+            self.pause_button.setText('Pause')
+
+    def cancel_worker(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def on_worker_progress(self, position, events, throughput):
+        self.k = position
+        if events:
+            self.history_textbox.appendHtml("".join(
+                f'<p style="color: {"blue" if hit else "red"};">{address} = {hex(address)}: {"Hit" if hit else "Miss"}</p>'
+                for address, hit, _ in events))
+            address, hit, line = events[-1]
+            self.update_instr_table(address)
+            self.update_statistics()
+            self.cache_model.refresh_all()
+            self.heatmap_model.refresh_all()
+            self.cache_table.scrollTo(self.cache_model.index(line, 0))
+        self.progress_bar.setValue(position)
+        self.throughput_label.setText(f"{throughput:,.0f} accesses/s")
+
+    def on_worker_finished(self, position, cancelled):
+        self.k = position
+        self.worker = None
+        self.worker_thread = None
+        if position >= len(self.address_sequence):
+            self.finish_simulation()
+        self.update_run_controls()
+
+    def closeEvent(self, event):
+        if self.worker_thread is not None:
+            self.worker.cancel()
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+        super().closeEvent(event)
 
 
     def create_cache_table(self):
-        num_blocks = self.cache_simulator.cache_size // self.cache_simulator.block_size
-        self.cache_table.setRowCount(num_blocks)
-        self.cache_table.setColumnCount(4)
-        self.cache_table.setHorizontalHeaderLabels(["Index", "Valid", "Tag", "Data"])
-
+        self.cache_model.set_simulator(self.cache_simulator)
+        self.heatmap_model.set_heatmap(self.heatmap)
         self.cache_table.setColumnWidth(2, 250)  # Wider Tag field
         self.cache_table.setColumnWidth(3, 250)  # Wider Data field
 
-
-        for i in range(num_blocks):
-            self.cache_table.setItem(i, 0, QTableWidgetItem(str(i)))
-            self.cache_table.setItem(i, 1, QTableWidgetItem("0"))  # Valid bit
-            self.cache_table.setItem(i, 2, QTableWidgetItem("-"))  # Tag
-            self.cache_table.setItem(i, 3, QTableWidgetItem("0"))  # Data
-
     def create_instr_table(self):
         self.instr_table.setRowCount(2)
         self.instr_table.setColumnCount(3)
@@ -407,43 +695,48 @@ class CacheSimulatorApp(QWidget):
         self.instr_table.setItem(0, 0, QTableWidgetItem(f'{self.cache_simulator.tag_bits} bits'))
         self.instr_table.setItem(0, 1, QTableWidgetItem(f'{self.cache_simulator.index_bits} bits'))
         self.instr_table.setItem(0, 2, QTableWidgetItem(f'{self.cache_simulator.offset_bits} bits'))
-
-
-
-    def update_cache_table(self):
-        offset_bits = self.cache_simulator.offset_bits
-        index_bits = self.cache_simulator.index_bits
-        tag_bits = self.cache_simulator.tag_bits
-        for index, tag in self.cache_simulator.cache.items():
-            if index < self.cache_table.rowCount():
-                self.cache_table.item(index, 1).setText("1")  # Valid bit
-                self.cache_table.item(index, 2).setText(bin(tag)[2:].zfill(tag_bits)[-tag_bits:])  # Tag
-                self.cache_table.item(index, 3).setText(f"BLOCK {hex((tag << index_bits | index)
-                                                                     << (offset_bits - 2))[2:]} WORD 0 - {(1 << self.cache_simulator.offset_bits) - 1}")
-        self.cache_table.setStyleSheet("QTableWidget::item { text-align: center; }")
+        for row in range(2):
+            for column in range(3):
+                self.instr_table.item(row, column).setTextAlignment(Qt.AlignCenter)
+
+
+    def update_cache_table(self, hit):
+        line = self.cache_simulator.current_index
+        if not hit:
+            # A miss only ever rewrites the line it lands in
+            self.cache_model.refresh_line(line)
+            if self.heatmap.peak_conflicts != self.heatmap_peak:
+                self.heatmap_peak = self.heatmap.peak_conflicts
+                self.heatmap_model.refresh_all()
+            else:
+                self.heatmap_model.refresh_row(set_of_line(self.cache_simulator, line))
+        self.cache_table.scrollTo(self.cache_model.index(line, 0))
 
 
     def update_instr_table(self, address):
         offset_bits = self.cache_simulator.offset_bits
         index_bits = self.cache_simulator.index_bits
         tag_bits = self.cache_simulator.tag_bits
+        index = self.cache_simulator.current_index
+        if self.cache_simulator.mapping == "Set Associative":
+            index = self.cache_simulator.current_set
         self.instr_table.item(1, 0).setText(bin(self.cache_simulator.current_tag)[2:].zfill(tag_bits)[-tag_bits:])
-        self.instr_table.item(1, 1).setText(bin(self.cache_simulator.current_index)[2:].zfill(index_bits)[-index_bits:])
+        self.instr_table.item(1, 1).setText(bin(index)[2:].zfill(index_bits)[-index_bits:])
         self.instr_table.item(1, 2).setText(bin(address)[2:].zfill(offset_bits)[-offset_bits:])
-        self.instr_table.setStyleSheet("QTableWidget::item { text-align: center; }")
 
 
-    def update_result_textbox(self, address):
-        hit_or_miss = "Hit" if address in self.cache_simulator.hit_instructions else "Miss"
+    def update_result_textbox(self, address, hit):
+        hit_or_miss = "Hit" if hit else "Miss"
+        color = "blue" if hit else "red"
         self.hitMiss.setPlainText(f"{address} = {hex(address)}: {hit_or_miss}")
-        self.hitMiss.setStyleSheet("color: blue;" if hit_or_miss == "Hit" else "color: red;")
+        if self.hitMiss.styleSheet() != f"color: {color};":
+            # Restyling is expensive, only do it when the outcome flips
+            self.hitMiss.setStyleSheet(f"color: {color};")
 
-        if hit_or_miss == "Hit":
-            self.history_textbox.setTextColor(Qt.blue)
-        else:
-            self.history_textbox.setTextColor(Qt.red)
-        self.history_textbox.append(f"{address} = {hex(address)}: {hit_or_miss}")
+        self.history_textbox.appendHtml(f'<span style="color: {color};">{address} = {hex(address)}: {hit_or_miss}</span>')
+        self.update_statistics()
 
+    def update_statistics(self):
         total_accesses = self.cache_simulator.hits + self.cache_simulator.misses
         hit_rate = (self.cache_simulator.hits / total_accesses) * 100 if total_accesses > 0 else 0
         miss_rate = (self.cache_simulator.misses / total_accesses) * 100 if total_accesses > 0 else 0
@@ -452,10 +745,15 @@ class CacheSimulatorApp(QWidget):
             f"Hits: {self.cache_simulator.hits} ({hit_rate:.2f}%)\n"
             f"Misses: {self.cache_simulator.misses} ({miss_rate:.2f}%)\n"
             f"Evictions: {self.cache_simulator.evictions}\n"
+            + f"Misses in the first {len(self.timeline.outcomes)} accesses: "
+            + ", ".join(f"{kind.capitalize()}: {self.heatmap.counts[kind]}" for kind in MISS_KINDS)
         )
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        from cli import main
+        sys.exit(main(sys.argv[1:]))
     app = QApplication(sys.argv)
     window = CacheSimulatorApp()
     window.setGeometry(100, 100, 600, 600)
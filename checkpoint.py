@@ -0,0 +1,170 @@
+"""Snapshots of simulator state: seek and step back through a trace, save and resume runs.
+
+A Timeline steps a simulator through a fixed address sequence. Every ``interval``
+accesses it keeps a pickled CacheSimulator.get_state() snapshot, and for every access a
+delta: the line it touched, the tag it evicted and the tag it inserted.
+
+Stepping back undoes one delta, which restores the cache contents and counters in O(1)
+but not the replacement metadata (recency order, use counts, RNG). The timeline then
+marks itself inexact and, before the next forward step, reloads the nearest snapshot and
+replays at most ``interval`` accesses. Long jumps in either direction work the same way.
+
+Each access is recorded in the history and reported to observers once, the first time it
+is simulated, so observer profiles describe the furthest point reached, not the current one.
+"""
+import pickle
+from array import array
+
+from simulator import CacheSimulator
+
+DEFAULT_INTERVAL = 4096
+
+# Delta value for "no tag": the line was empty before a miss
+NO_TAG = -1
+
+CHECKPOINT_VERSION = 2
+
+
+class Timeline:
+    def __init__(self, simulator, addresses, interval=None):
+        # Snapshots cost O(lines), so big caches get proportionally sparser ones
+        self.interval = interval or max(DEFAULT_INTERVAL, simulator.num_lines // 16)
+        if self.interval <= 0:
+            raise ValueError("Snapshot interval must be positive!")
+        self.simulator = simulator
+        self.addresses = addresses
+        self.position = 0
+        self.exact = True
+        self.snapshots = {0: self.snapshot()}
+        self.lines = array("q")
+        self.evicted_tags = array("q")
+        self.inserted_tags = array("q")
+        self.outcomes = bytearray()
+
+    def __len__(self):
+        return len(self.addresses)
+
+    def snapshot(self):
+        return pickle.dumps(self.simulator.get_state(), pickle.HIGHEST_PROTOCOL)
+
+    def step(self):
+        """Simulate the next access and return True on a hit."""
+        if not self.exact:
+            self.restore(self.position)
+        position = self.position
+        simulator = self.simulator
+        if position < len(self.outcomes):
+            # Accesses stepped through before are already in the history and the observers
+            record_history, observers = simulator.record_history, simulator.observers
+            simulator.record_history, simulator.observers = False, []
+            try:
+                hit = simulator.access_memory_address(self.addresses[position])
+            finally:
+                simulator.record_history, simulator.observers = record_history, observers
+        else:
+            hit = simulator.access_memory_address(self.addresses[position])
+        if position == len(self.outcomes):
+            line = simulator.current_index
+            evicted = simulator.evicted_tag
+            self.lines.append(line)
+            self.evicted_tags.append(NO_TAG if hit or evicted is None else evicted)
+            self.inserted_tags.append(simulator.line_tag(line))
+            self.outcomes.append(hit)
+        self.position = position + 1
+        if self.position % self.interval == 0 and self.position not in self.snapshots:
+            self.snapshots[self.position] = self.snapshot()
+        return hit
+
+    def step_back(self):
+        """Undo the latest access and return the line it touched, or None at the start."""
+        if self.position == 0:
+            return None
+        self.position -= 1
+        position = self.position
+        simulator = self.simulator
+        line = self.lines[position]
+        if self.outcomes[position]:
+            simulator.hits -= 1
+        else:
+            simulator.misses -= 1
+            evicted = self.evicted_tags[position]
+            if evicted == NO_TAG:
+                simulator.set_line(line, None)
+            else:
+                simulator.evictions -= 1
+                simulator.set_line(line, evicted)
+        if position:
+            simulator.current_index = self.lines[position - 1]
+            simulator.current_tag = self.inserted_tags[position - 1]
+        self.exact = False
+        return line
+
+    def restore(self, position):
+        """Load the nearest snapshot at or before ``position`` and replay up to it.
+
+        Replayed accesses are already in the simulator's history and were already reported to
+        its observers, so they are neither recorded nor reported again.
+        """
+        simulator = self.simulator
+        base = position - position % self.interval
+        simulator.set_state(pickle.loads(self.snapshots[base]))
+        self.position = base
+        self.exact = True
+        record_history, observers = simulator.record_history, simulator.observers
+        simulator.record_history, simulator.observers = False, []
+        try:
+            while self.position < position:
+                self.step()
+        finally:
+            simulator.record_history, simulator.observers = record_history, observers
+
+    def seek(self, position):
+        """Move to ``position`` (the number of accesses simulated) and return the lines changed on the way.
+
+        Short moves backward undo deltas; anything else restores a snapshot, then replays.
+        """
+        position = max(0, min(position, len(self.addresses)))
+        start = self.position
+        if position < start:
+            changed = self.changes(position, start)
+            if start - position <= self.interval:
+                for _ in range(start - position):
+                    self.step_back()
+            else:
+                self.restore(position)
+            return changed
+        base = position - position % self.interval
+        if not self.exact or (base > start and base in self.snapshots):
+            self.restore(min(position, len(self.outcomes)))
+        while self.position < position:
+            self.step()
+        return self.changes(start, position)
+
+    def changes(self, start, stop):
+        """Return the set of lines whose contents changed in accesses ``start`` to ``stop``."""
+        stop = min(stop, len(self.outcomes))
+        return {self.lines[position] for position in range(start, stop) if not self.outcomes[position]}
+
+    def save(self, path):
+        if not self.exact:
+            self.restore(self.position)
+        save_checkpoint(path, self.simulator, self.position)
+
+
+def save_checkpoint(path, simulator, position):
+    """Write the simulator state and the trace position it was taken at."""
+    with open(path, "wb") as file:
+        pickle.dump({"version": CHECKPOINT_VERSION, "position": position, "state": simulator.get_state()},
+                    file, pickle.HIGHEST_PROTOCOL)
+
+
+def load_checkpoint(path, **kwargs):
+    """Return ``(simulator, position)`` from a checkpoint; ``kwargs`` go to the CacheSimulator constructor."""
+    with open(path, "rb") as file:
+        try:
+            checkpoint = pickle.load(file)
+        except (pickle.UnpicklingError, EOFError):
+            raise ValueError(f"Not a checkpoint: {path}")
+    if not isinstance(checkpoint, dict) or checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Not a checkpoint: {path}")
+    return CacheSimulator.from_state(checkpoint["state"], **kwargs), checkpoint["position"]
@@ -0,0 +1,442 @@
+"""Command-line front end for headless cache simulations.
+
+Run ``python cache.py <command> ...``; without arguments ``cache.py`` starts the GUI.
+``python cli.py <command> ...`` does the same without ever importing Qt.
+"""
+import argparse
+import sys
+import time
+
+from simulator import CacheSimulator, MAPPINGS, REPLACEMENT_POLICIES, TraceResult
+from benchmark import DEFAULT_ACCESSES, DEFAULT_CACHE_SIZES, DEFAULT_THRESHOLD, compare_results, read_report, \
+    run_benchmarks, write_report
+from checkpoint import load_checkpoint, save_checkpoint
+from hierarchy import CacheHierarchy, INCLUSION_POLICIES
+from history import DEFAULT_HISTORY_SIZE, HISTORY_MODES
+from instrumentation import MISS_KINDS, ConflictHeatmap, EvictionAgeHistogram, ReuseDistanceHistogram
+from result_cache import DEFAULT_MAX_BYTES, ResultCache, default_directory
+from sampling import DEFAULT_CONFIDENCE, MIN_SAMPLES, sample_periodic, sample_sets
+from stack_distance import StackDistanceAnalyzer
+from sweep import configurations, simulate_sharded, sweep, write_csv, write_results
+from traces import DEFAULT_CHUNK_SIZE, TRACE_FORMATS, convert_trace
+from workloads import WORKLOADS, Workload
+
+MAPPING_ALIASES = {
+    "direct": "Direct Mapping",
+    "fully": "Fully Associative",
+    "set": "Set Associative",
+}
+
+
+def mapping_name(value):
+    mapping = MAPPING_ALIASES.get(value.lower(), value)
+    if mapping not in MAPPINGS:
+        raise argparse.ArgumentTypeError(f"Unknown mapping: {value}")
+    return mapping
+
+
+def policy_name(value):
+    policy = value.upper()
+    if policy not in REPLACEMENT_POLICIES:
+        raise argparse.ArgumentTypeError(f"Unknown replacement policy: {value}")
+    return policy
+
+
+def level_spec(value):
+    """Parse ``CACHE_SIZE:BLOCK_SIZE:MAPPING:POLICY[:ASSOCIATIVITY]``."""
+    fields = value.split(":")
+    if len(fields) not in (4, 5):
+        raise argparse.ArgumentTypeError(f"Expected CACHE_SIZE:BLOCK_SIZE:MAPPING:POLICY[:ASSOCIATIVITY], got {value}")
+    try:
+        sizes = [int(field) for field in fields[:2] + fields[4:]]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size in {value}")
+    return sizes[0], sizes[1], mapping_name(fields[2]), policy_name(fields[3]), sizes[2] if len(sizes) > 2 else 2
+
+
+def comma_list(item_type):
+    def parse(value):
+        return [item_type(item.strip()) for item in value.split(",") if item.strip()]
+    return parse
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--memory-size", type=int, default=1 << 32, help="memory size in bytes")
+    parser.add_argument("--cache-size", type=int, default=32768, help="cache size in bytes")
+    parser.add_argument("--block-size", type=int, default=64, help="block size in bytes")
+    parser.add_argument("--mapping", type=mapping_name, default="Direct Mapping",
+                        help="direct, fully, set or a full mapping name")
+    parser.add_argument("--policy", type=policy_name, default="LRU", help="replacement policy")
+    parser.add_argument("--associativity", type=int, default=2, help="ways per set of the set associative mapping")
+
+
+def add_result_cache_arguments(parser):
+    parser.add_argument("--result-cache", nargs="?", const=default_directory(), default=None, metavar="DIR",
+                        help="reuse and store results in an on-disk cache (default directory: %(const)s)")
+    parser.add_argument("--result-cache-size", type=int, default=DEFAULT_MAX_BYTES,
+                        help="bytes the result cache may use before evicting the least recently used results")
+
+
+def add_trace_arguments(parser):
+    parser.add_argument("trace", help="trace file (binary, or text/din, optionally gzip-compressed)")
+    parser.add_argument("--format", dest="trace_format", choices=TRACE_FORMATS, default="auto")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+
+def format_result(result):
+    return (f"Accesses: {result.accesses}\n"
+            f"Hits: {result.hits} ({result.hit_rate * 100:.2f}%)\n"
+            f"Misses: {result.misses} ({result.miss_rate * 100:.2f}%)\n"
+            f"Evictions: {result.evictions}")
+
+
+def command_run(args):
+    if args.shards:
+        return command_run_sharded(args)
+    if args.result_cache:
+        return command_run_cached(args)
+    history = {"history": args.history, "history_size": args.history_size, "history_path": args.history_log}
+    if args.resume:
+        # The cache configuration comes from the checkpoint
+        simulator, position = load_checkpoint(args.resume, **history)
+    else:
+        simulator = CacheSimulator(args.memory_size, args.cache_size, args.block_size, args.mapping, args.policy,
+                                   seed=args.seed, associativity=args.associativity, **history)
+        position = 0
+    profiles = None
+    if args.profile:
+        profiles = [simulator.add_observer(observer)
+                    for observer in (ConflictHeatmap(), ReuseDistanceHistogram(), EvictionAgeHistogram())]
+    on_chunk = checkpoint_saver(args.checkpoint, simulator, position, args.checkpoint_every) \
+        if args.checkpoint else None
+    start = time.perf_counter()
+    try:
+        result = simulator.run_trace(args.trace, args.chunk_size, args.trace_format, vectorized=not args.scalar,
+                                     start=position, on_chunk=on_chunk)
+        if args.checkpoint:
+            save_checkpoint(args.checkpoint, simulator, position + result.accesses)
+    finally:
+        simulator.close()
+    elapsed = time.perf_counter() - start
+    if args.resume:
+        # Report the whole run, not just the part simulated since the checkpoint
+        print(f"Resumed at access {position}")
+        print(format_result(TraceResult(simulator.hits + simulator.misses, simulator.hits, simulator.misses,
+                                        simulator.evictions)))
+    else:
+        print(format_result(result))
+    if elapsed > 0:
+        print(f"Throughput: {result.accesses / elapsed:,.0f} accesses/s")
+    if profiles:
+        print_profiles(*profiles)
+    return 0
+
+
+def checkpoint_saver(path, simulator, position, every):
+    """Return an on_chunk callback that saves a checkpoint about every ``every`` accesses."""
+    every = max(1, every)
+    next_checkpoint = [position + every]
+
+    def save(reached):
+        if reached >= next_checkpoint[0]:
+            save_checkpoint(path, simulator, reached)
+            next_checkpoint[0] = reached + every
+    return save
+
+
+def print_ranges(title, ranges):
+    print(title)
+    for low, high, count in ranges:
+        print(f"{low:>12} - {high:<12} {count:>12}")
+
+
+def print_profiles(heatmap, reuse, ages):
+    misses = sum(heatmap.counts.values())
+    print("Miss classes:")
+    for kind in MISS_KINDS:
+        share = heatmap.counts[kind] / misses * 100 if misses else 0
+        print(f"  {kind:>10}: {heatmap.counts[kind]} ({share:.2f}%)")
+    print("Sets with the most conflict misses (set, conflict misses, misses):")
+    for set_index, conflicts, set_misses in heatmap.hottest():
+        print(f"  {set_index:>10} {conflicts:>12} {set_misses:>12}")
+    print(f"First touches: {reuse.first_touches}")
+    print_ranges("Reuse distances (distinct blocks):", reuse.histogram())
+    print_ranges("Eviction ages (accesses since fill):", ages.ages())
+    print_ranges("Eviction idle times (accesses since last use):", ages.idle_times())
+
+
+def result_cache(args):
+    return ResultCache(args.result_cache, args.result_cache_size) if args.result_cache else None
+
+
+def command_run_cached(args):
+    if args.resume or args.checkpoint or args.history != "off" or args.profile:
+        raise ValueError("--result-cache cannot be combined with --resume, --checkpoint, --history or --profile")
+    config = (args.memory_size, args.cache_size, args.block_size, args.mapping, args.policy, args.associativity)
+    start = time.perf_counter()
+    result = result_cache(args).run(args.trace, config, args.seed, args.chunk_size, args.trace_format)
+    print(format_result(result))
+    print(f"Time: {time.perf_counter() - start:.3f}s")
+    return 0
+
+
+def command_run_sharded(args):
+    if args.resume or args.checkpoint or args.history != "off" or args.profile:
+        raise ValueError("--shards cannot be combined with --resume, --checkpoint, --history or --profile")
+    config = (args.memory_size, args.cache_size, args.block_size, args.mapping, args.policy, args.associativity)
+    start = time.perf_counter()
+    result, _ = simulate_sharded(args.trace, config, args.shards, args.chunk_size, args.trace_format, args.seed)
+    elapsed = time.perf_counter() - start
+    print(format_result(result))
+    if elapsed > 0:
+        print(f"Throughput: {result.accesses / elapsed:,.0f} accesses/s")
+    return 0
+
+
+def command_sample(args):
+    simulator = CacheSimulator(args.memory_size, args.cache_size, args.block_size, args.mapping, args.policy,
+                               seed=args.seed, history="off", associativity=args.associativity)
+    if args.sets:
+        result = sample_sets(simulator, args.trace, args.sets, args.seed, args.confidence, args.chunk_size,
+                             args.trace_format)
+        samples = "sets"
+    else:
+        result = sample_periodic(simulator, args.trace, args.period, args.window, args.warmup, args.confidence,
+                                 args.chunk_size, args.trace_format)
+        samples = "windows"
+    hit_low, hit_high = result.hit_rate_interval
+    miss_low, miss_high = result.miss_rate_interval
+    confidence = result.confidence * 100
+    print(f"Accesses: {result.accesses} ({result.simulated} simulated in {result.samples} {samples})")
+    print(f"Hit rate: {result.hit_rate * 100:.2f}% ({confidence:g}% CI {hit_low * 100:.2f}% - {hit_high * 100:.2f}%)")
+    print(f"Miss rate: {result.miss_rate * 100:.2f}% ({confidence:g}% CI {miss_low * 100:.2f}% - {miss_high * 100:.2f}%)")
+    print(f"Speedup: {result.speedup:.1f}x fewer accesses simulated than a full run")
+    if result.samples < MIN_SAMPLES:
+        print(f"warning: only {result.samples} {samples} sampled; the confidence interval is a rough approximation",
+              file=sys.stderr)
+    if result.seconds > 0:
+        print(f"Time: {result.seconds:.2f}s, a full run would take about {result.seconds * result.speedup:.2f}s")
+    return 0
+
+
+def command_mrc(args):
+    analyzer = StackDistanceAnalyzer(args.memory_size, args.block_size)
+    results = analyzer.run_trace(args.trace, args.chunk_size, args.trace_format)
+    print(f"{'Cache Size':>12} {'Lines':>10} {'Hits':>12} {'Misses':>12} {'Hit Rate':>9} {'Evictions':>12}")
+    for result in results:
+        hit_rate = result.hits / analyzer.accesses * 100 if analyzer.accesses else 0
+        print(f"{result.cache_size:>12} {result.lines:>10} {result.hits:>12} {result.misses:>12} "
+              f"{hit_rate:>8.2f}% {result.evictions:>12}")
+    return 0
+
+
+def command_hierarchy(args):
+    levels = [CacheSimulator(args.memory_size, cache_size, block_size, mapping, policy, seed=args.seed,
+                             history="off", associativity=associativity)
+              for cache_size, block_size, mapping, policy, associativity in args.levels]
+    hierarchy = CacheHierarchy(levels, args.inclusion)
+    start = time.perf_counter()
+    result = hierarchy.run_trace(args.trace, args.chunk_size, args.trace_format)
+    elapsed = time.perf_counter() - start
+    print(f"{'Level':>5} {'Accesses':>12} {'Hits':>12} {'Misses':>12} {'Hit Rate':>9} {'Evictions':>12}")
+    for depth, level in enumerate(result.levels, 1):
+        print(f"{'L' + str(depth):>5} {level.accesses:>12} {level.hits:>12} {level.misses:>12} "
+              f"{level.hit_rate * 100:>8.2f}% {level.evictions:>12}")
+    print(f"Accesses: {result.accesses}")
+    print(f"Memory accesses: {result.memory_accesses} (global miss rate {result.global_miss_rate * 100:.2f}%)")
+    if elapsed > 0:
+        print(f"Throughput: {result.accesses / elapsed:,.0f} accesses/s")
+    return 0
+
+
+def command_sweep(args):
+    configs = configurations(args.memory_sizes, args.cache_sizes, args.block_sizes, args.mappings, args.policies,
+                             args.associativities)
+    if not configs:
+        raise ValueError("No valid configuration in the sweep grid!")
+    start = time.perf_counter()
+    rows = sweep(args.trace, configs, args.workers, args.chunk_size, args.trace_format, args.seed, result_cache(args))
+    elapsed = time.perf_counter() - start
+    if args.output:
+        write_results(rows, args.output)
+    else:
+        write_csv(rows, sys.stdout)
+    print(f"{len(rows)} configurations in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+def workload_name(value):
+    if value not in WORKLOADS:
+        raise argparse.ArgumentTypeError(f"Unknown workload: {value}")
+    return value
+
+
+def command_bench(args):
+    def on_result(row):
+        speed = row["accesses_per_second"]
+        memory = row["peak_memory"]
+        print(f"{row['workload']:>10} {row['mapping']:>17} {row['replacement_policy']:>6} {row['cache_size']:>8} "
+              f"{speed or 0:>12,.0f}/s {'-' if memory is None else f'{memory:,}':>12} B", file=sys.stderr)
+
+    report = run_benchmarks(args.workloads, args.mappings, args.policies, args.cache_sizes, args.accesses,
+                            block_size=args.block_size, associativity=args.associativity, repeat=args.repeat,
+                            memory=not args.no_memory, vectorized=not args.scalar, on_result=on_result)
+    if args.output:
+        write_report(report, args.output)
+    if args.baseline:
+        return report_regressions(report, read_report(args.baseline), args.threshold)
+    return 0
+
+
+def command_compare(args):
+    return report_regressions(read_report(args.current), read_report(args.baseline), args.threshold)
+
+
+def report_regressions(current, baseline, threshold):
+    regressions = compare_results(current, baseline, threshold)
+    for key, metric, old, new in regressions:
+        print(f"REGRESSION {' '.join(map(str, key))}: {metric} {old:,.0f} -> {new:,.0f}")
+    print(f"{len(regressions)} regressions beyond {threshold * 100:.0f}%")
+    return 1 if regressions else 0
+
+
+def command_generate(args):
+    start = time.perf_counter()
+    workload = Workload(args.workload, args.count, args.memory_size, args.seed)
+    count = convert_trace(workload, args.output, address_width=args.width, chunk_size=args.chunk_size)
+    print(f"Wrote {count} {args.workload} accesses to {args.output} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def command_convert(args):
+    start = time.perf_counter()
+    count = convert_trace(args.trace, args.output, args.trace_format, args.width, args.chunk_size)
+    print(f"Wrote {count} accesses to {args.output} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cache.py", description="Headless cache memory simulation.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="simulate a trace and print hit/miss/eviction counters")
+    add_trace_arguments(run)
+    add_cache_arguments(run)
+    run.add_argument("--seed", type=int, default=None, help="seed for RANDOM replacement")
+    run.add_argument("--history", choices=HISTORY_MODES, default="off",
+                     help="per-access history to keep (spill streams every event to --history-log)")
+    run.add_argument("--history-size", type=int, default=DEFAULT_HISTORY_SIZE,
+                     help="events kept in memory by the ring and spill modes")
+    run.add_argument("--history-log", help="binary event log written by --history spill")
+    run.add_argument("--scalar", action="store_true",
+                     help="use the per-address reference path even where a batch kernel exists")
+    run.add_argument("--checkpoint", help="file to save the simulator state to, periodically and at the end")
+    run.add_argument("--checkpoint-every", type=int, default=1 << 20,
+                     help="accesses between checkpoints (rounded up to whole chunks)")
+    run.add_argument("--resume", help="checkpoint to continue from; the cache options are taken from it")
+    add_result_cache_arguments(run)
+    run.add_argument("--profile", action="store_true",
+                     help="print miss classes, per-set conflicts, reuse distances and eviction ages")
+    run.add_argument("--shards", type=int, default=0,
+                     help="split the sets of a direct-mapped or set associative cache over this many processes")
+    run.set_defaults(handler=command_run)
+
+    sample = commands.add_parser("sample", help="estimate hit and miss rates from samples of a trace")
+    add_trace_arguments(sample)
+    add_cache_arguments(sample)
+    sample.add_argument("--period", type=int, default=1 << 20, help="accesses per sampling period")
+    sample.add_argument("--window", type=int, default=1 << 14, help="measured accesses per period")
+    sample.add_argument("--warmup", type=int, default=1 << 15,
+                        help="accesses simulated but not measured before each window")
+    sample.add_argument("--sets", type=float, default=None,
+                        help="sample this fraction of the sets instead of periodic windows")
+    sample.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE)
+    sample.add_argument("--seed", type=int, default=None, help="seed for RANDOM replacement and set selection")
+    sample.set_defaults(handler=command_sample)
+
+    mrc = commands.add_parser("mrc", help="fully associative LRU hit/miss counts for every power-of-two "
+                                          "cache size in one pass")
+    add_trace_arguments(mrc)
+    mrc.add_argument("--memory-size", type=int, default=1 << 32, help="memory size in bytes")
+    mrc.add_argument("--block-size", type=int, default=64, help="block size in bytes")
+    mrc.set_defaults(handler=command_mrc)
+
+    hierarchy = commands.add_parser("hierarchy", help="simulate a multi-level cache hierarchy")
+    add_trace_arguments(hierarchy)
+    hierarchy.add_argument("--level", dest="levels", type=level_spec, action="append", required=True,
+                           help="CACHE_SIZE:BLOCK_SIZE:MAPPING:POLICY[:ASSOCIATIVITY], once per level, L1 first")
+    hierarchy.add_argument("--inclusion", choices=INCLUSION_POLICIES, default="non-inclusive")
+    hierarchy.add_argument("--memory-size", type=int, default=1 << 32, help="memory size in bytes")
+    hierarchy.add_argument("--seed", type=int, default=None, help="seed for RANDOM replacement")
+    hierarchy.set_defaults(handler=command_hierarchy)
+
+    sweep_parser = commands.add_parser("sweep", help="simulate a grid of configurations in parallel")
+    add_trace_arguments(sweep_parser)
+    sweep_parser.add_argument("--memory-sizes", type=comma_list(int), default=[1 << 32])
+    sweep_parser.add_argument("--cache-sizes", type=comma_list(int), default=[4096, 16384, 65536])
+    sweep_parser.add_argument("--block-sizes", type=comma_list(int), default=[64])
+    sweep_parser.add_argument("--mappings", type=comma_list(mapping_name), default=list(MAPPINGS))
+    sweep_parser.add_argument("--policies", type=comma_list(policy_name), default=list(REPLACEMENT_POLICIES))
+    sweep_parser.add_argument("--associativities", type=comma_list(int), default=[2, 4, 8],
+                              help="ways per set tried for the set associative mapping")
+    sweep_parser.add_argument("--seed", type=int, default=None, help="seed for RANDOM replacement")
+    sweep_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    sweep_parser.add_argument("-o", "--output", help="CSV or .parquet file (default: CSV on stdout)")
+    add_result_cache_arguments(sweep_parser)
+    sweep_parser.set_defaults(handler=command_sweep)
+
+    bench = commands.add_parser("bench", help="measure throughput and peak memory over synthetic workloads")
+    bench.add_argument("--workloads", type=comma_list(workload_name), default=list(WORKLOADS))
+    bench.add_argument("--mappings", type=comma_list(mapping_name), default=list(MAPPINGS))
+    bench.add_argument("--policies", type=comma_list(policy_name), default=list(REPLACEMENT_POLICIES))
+    bench.add_argument("--cache-sizes", type=comma_list(int), default=DEFAULT_CACHE_SIZES)
+    bench.add_argument("--block-size", type=int, default=16)
+    bench.add_argument("--associativity", type=int, default=4, help="ways of the set associative mapping")
+    bench.add_argument("--accesses", type=int, default=DEFAULT_ACCESSES, help="accesses per workload")
+    bench.add_argument("--repeat", type=int, default=1, help="runs per configuration; the fastest counts")
+    bench.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    bench.add_argument("--scalar", action="store_true",
+                       help="time the per-address path even where a batch kernel exists")
+    bench.add_argument("-o", "--output", help="JSON report to write")
+    bench.add_argument("--baseline", help="JSON report to compare against; exits with 1 on regressions")
+    bench.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help="tolerated slowdown or memory growth, as a fraction")
+    bench.set_defaults(handler=command_bench)
+
+    compare = commands.add_parser("compare", help="flag regressions between two benchmark reports")
+    compare.add_argument("current", help="JSON report to check")
+    compare.add_argument("baseline", help="JSON report to compare against")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                         help="tolerated slowdown or memory growth, as a fraction")
+    compare.set_defaults(handler=command_compare)
+
+    generate = commands.add_parser("generate", help="write a synthetic workload as a binary trace")
+    generate.add_argument("workload", type=workload_name, help=", ".join(WORKLOADS))
+    generate.add_argument("output", help="binary trace file to write")
+    generate.add_argument("--count", type=int, default=1 << 20, help="number of accesses")
+    generate.add_argument("--memory-size", type=int, default=1 << 32, help="memory size in bytes")
+    generate.add_argument("--seed", type=int, default=None)
+    generate.add_argument("--width", type=int, choices=(4, 8), default=8, help="address width in bytes")
+    generate.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    generate.set_defaults(handler=command_generate)
+
+    convert = commands.add_parser("convert", help="convert a text or din trace to the binary trace format")
+    add_trace_arguments(convert)
+    convert.add_argument("output", help="binary trace file to write")
+    convert.add_argument("--width", type=int, choices=(4, 8), default=8, help="address width in bytes")
+    convert.set_defaults(handler=command_convert)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (ValueError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
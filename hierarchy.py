@@ -0,0 +1,130 @@
+"""Multi-level cache hierarchies built from CacheSimulator levels (L1 first).
+
+Only the misses of a level reach the next one. Three inclusion policies are supported:
+
+``non-inclusive``  every level fills on a miss and evicts independently. Lower levels
+                   never act on upper ones, so each level filters a whole chunk before
+                   passing its miss stream down (through the batch kernel where one exists).
+``inclusive``      a block evicted from a lower level is back-invalidated in every level
+                   above it, so upper levels always hold a subset of lower ones.
+``exclusive``      a block lives in at most one level: a lower-level hit moves the block up
+                   to L1, and each level's victim is moved down into the next level.
+
+Back-invalidation and victim moves change upper levels in the middle of a chunk, so the
+inclusive and exclusive policies step one access at a time through the hierarchy.
+"""
+from collections import namedtuple
+
+from simulator import TraceResult
+from traces import DEFAULT_CHUNK_SIZE, iter_chunks
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+INCLUSION_POLICIES = ("non-inclusive", "inclusive", "exclusive")
+
+
+class HierarchyResult(namedtuple("HierarchyResult", ["accesses", "levels"])):
+    """Counters of a hierarchy run: ``levels`` holds one TraceResult per level, L1 first.
+
+    A level's accesses are the misses of the level above it (its local hit rate is relative
+    to those); the global miss rate is the share of all accesses that went to memory.
+    """
+
+    @property
+    def memory_accesses(self):
+        return self.levels[-1].misses if self.levels else self.accesses
+
+    @property
+    def global_miss_rate(self):
+        return self.memory_accesses / self.accesses if self.accesses else 0.0
+
+
+class CacheHierarchy:
+    def __init__(self, levels, inclusion="non-inclusive"):
+        if not levels:
+            raise ValueError("A cache hierarchy needs at least one level!")
+        if inclusion not in INCLUSION_POLICIES:
+            raise ValueError(f"Unknown inclusion policy: {inclusion}")
+        if inclusion != "non-inclusive" and len({level.block_size for level in levels}) > 1:
+            raise ValueError(f"All levels of an {inclusion} hierarchy must have the same block size!")
+        self.levels = list(levels)
+        self.inclusion = inclusion
+        self.accesses = 0
+
+    def access(self, address):
+        """Simulate one access; return the number of the level that hit (0 is L1), or len(levels) for memory."""
+        self.accesses += 1
+        if self.inclusion == "exclusive":
+            return self.access_exclusive(address)
+        for depth, level in enumerate(self.levels):
+            if level.access_memory_address(address):
+                return depth
+            if depth and self.inclusion == "inclusive":
+                evicted = level.evicted_address()
+                if evicted is not None:
+                    for upper in self.levels[:depth]:
+                        upper.invalidate(evicted)
+        return len(self.levels)
+
+    def access_exclusive(self, address):
+        first = self.levels[0]
+        if first.access_memory_address(address):
+            return 0
+        victim = first.evicted_address()
+        found = len(self.levels)
+        for depth, level in enumerate(self.levels[1:], 1):
+            # The block moves up to L1, which already holds it after the miss above
+            if level.invalidate(address):
+                level.hits += 1
+                found = depth
+                break
+            level.misses += 1
+        for level in self.levels[1:]:
+            if victim is None:
+                break
+            victim = level.fill(victim)
+        return found
+
+    def run_trace(self, trace, chunk_size=DEFAULT_CHUNK_SIZE, trace_format="auto"):
+        """Stream a trace (path or iterable of addresses) through the hierarchy in chunks.
+
+        Returns a HierarchyResult with the counters accumulated by this run only.
+        """
+        before = [(level.hits, level.misses, level.evictions) for level in self.levels]
+        accesses = self.accesses
+        try:
+            for chunk in iter_chunks(trace, chunk_size, trace_format):
+                if self.inclusion != "non-inclusive":
+                    if hasattr(chunk, "tolist"):
+                        chunk = chunk.tolist()
+                    access = self.access
+                    for address in chunk:
+                        access(address)
+                    continue
+                self.accesses += len(chunk)
+                for level in self.levels:
+                    chunk = miss_stream(level, chunk)
+                    if not len(chunk):
+                        break
+        finally:
+            for level in self.levels:
+                level.sync_kernel()
+        levels = []
+        for level, (hits, misses, evictions) in zip(self.levels, before):
+            hits, misses = level.hits - hits, level.misses - misses
+            levels.append(TraceResult(hits + misses, hits, misses, level.evictions - evictions))
+        return HierarchyResult(self.accesses - accesses, levels)
+
+
+def miss_stream(simulator, chunk):
+    """Simulate a chunk of addresses on one level and return the ones that missed, in order."""
+    if np is not None and simulator.mapping == "Direct Mapping":
+        chunk = np.asarray(chunk, dtype=np.int64)
+        return chunk[~simulator.access_batch(chunk, sync=False)]
+    if hasattr(chunk, "tolist"):
+        chunk = chunk.tolist()
+    access = simulator.access_memory_address
+    return [address for address in chunk if not access(address)]
@@ -0,0 +1,242 @@
+"""Per-access hit/miss history kept by CacheSimulator, with bounded-memory modes.
+
+- "full": every event, plus the legacy hit_instructions/miss_instructions lists
+- "off": nothing at all
+- "counters": only event counts and the last event
+- "ring": the last ``size`` events in preallocated arrays
+- "spill": a ring of recent events, with every event also streamed to an on-disk log.
+  The log is a binary trace (see traces.BinaryTrace) whose access-kind byte holds the
+  outcome, 1 for a hit and 0 for a miss.
+"""
+from array import array
+
+from traces import BinaryTraceWriter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HISTORY_MODES = ("full", "off", "counters", "ring", "spill")
+
+DEFAULT_HISTORY_SIZE = 1024
+
+
+def format_event(address, hit):
+    return f'{hex(address)}: {"Hit" if hit else "Miss"}\n'
+
+
+class History:
+    """Base class: records nothing."""
+
+    mode = "off"
+
+    def __init__(self):
+        self.count = 0
+
+    def record(self, address, hit):
+        pass
+
+    def record_batch(self, addresses, hit_mask):
+        for address, hit in zip(addresses.tolist(), hit_mask.tolist()):
+            self.record(address, hit)
+
+    def recent(self, count=None):
+        """Return up to ``count`` retained events as (address, hit) pairs, oldest first."""
+        return []
+
+    @property
+    def last(self):
+        events = self.recent(1)
+        return events[0] if events else None
+
+    @property
+    def hit_instructions(self):
+        return [address for address, hit in self.recent() if hit]
+
+    @property
+    def miss_instructions(self):
+        return [address for address, hit in self.recent() if not hit]
+
+    def text(self):
+        return "".join(format_event(address, hit) for address, hit in self.recent())
+
+    def clear(self):
+        self.count = 0
+
+    def close(self):
+        pass
+
+
+class CounterHistory(History):
+    mode = "counters"
+
+    def __init__(self):
+        super().__init__()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.last_event = None
+
+    def record(self, address, hit):
+        self.count += 1
+        if hit:
+            self.hit_count += 1
+        else:
+            self.miss_count += 1
+        self.last_event = (address, hit)
+
+    def record_batch(self, addresses, hit_mask):
+        if len(addresses) == 0:
+            return
+        hits = int(hit_mask.sum())
+        self.count += len(addresses)
+        self.hit_count += hits
+        self.miss_count += len(addresses) - hits
+        self.last_event = (int(addresses[-1]), bool(hit_mask[-1]))
+
+    def recent(self, count=None):
+        return [self.last_event] if self.last_event is not None and count != 0 else []
+
+    def clear(self):
+        self.__init__()
+
+
+class FullHistory(History):
+    """Unbounded history: compact address/outcome arrays plus the legacy address lists."""
+
+    mode = "full"
+
+    def __init__(self):
+        super().__init__()
+        self.addresses = array("q")
+        self.outcomes = bytearray()
+        self.hits = []
+        self.misses = []
+
+    def record(self, address, hit):
+        self.count += 1
+        self.addresses.append(address)
+        self.outcomes.append(hit)
+        if hit:
+            self.hits.append(address)
+        else:
+            self.misses.append(address)
+
+    def record_batch(self, addresses, hit_mask):
+        if np is None:
+            return super().record_batch(addresses, hit_mask)
+        addresses = np.asarray(addresses, dtype=np.int64)
+        hit_mask = np.asarray(hit_mask, dtype=bool)
+        self.count += len(addresses)
+        self.addresses.frombytes(addresses.tobytes())
+        self.outcomes += hit_mask.tobytes()
+        self.hits += addresses[hit_mask].tolist()
+        self.misses += addresses[~hit_mask].tolist()
+
+    def recent(self, count=None):
+        start = 0 if count is None else max(0, self.count - count)
+        return [(address, bool(hit)) for address, hit in zip(self.addresses[start:], self.outcomes[start:])]
+
+    @property
+    def hit_instructions(self):
+        return self.hits
+
+    @property
+    def miss_instructions(self):
+        return self.misses
+
+    def clear(self):
+        self.__init__()
+
+
+class RingHistory(History):
+    """The last ``size`` events in fixed arrays, overwritten oldest first."""
+
+    mode = "ring"
+
+    def __init__(self, size=DEFAULT_HISTORY_SIZE):
+        super().__init__()
+        if size <= 0:
+            raise ValueError("History size must be positive!")
+        self.size = size
+        self.addresses = array("q", bytes(8 * size))
+        self.outcomes = bytearray(size)
+
+    def record(self, address, hit):
+        position = self.count % self.size
+        self.addresses[position] = address
+        self.outcomes[position] = hit
+        self.count += 1
+
+    def record_batch(self, addresses, hit_mask):
+        if np is None:
+            return super().record_batch(addresses, hit_mask)
+        total = len(hit_mask)
+        # Only the events that survive in the ring need to be written
+        addresses = np.asarray(addresses, dtype=np.int64)[-self.size:]
+        hit_mask = np.asarray(hit_mask, dtype=np.uint8)[-self.size:]
+        positions = (self.count + total - len(hit_mask) + np.arange(len(hit_mask))) % self.size
+        np.frombuffer(self.addresses, dtype=np.int64)[positions] = addresses
+        np.frombuffer(self.outcomes, dtype=np.uint8)[positions] = hit_mask
+        self.count += total
+
+    def recent(self, count=None):
+        retained = min(self.count, self.size)
+        count = retained if count is None else min(count, retained)
+        start = self.count - count
+        return [(self.addresses[position % self.size], bool(self.outcomes[position % self.size]))
+                for position in range(start, self.count)]
+
+    def clear(self):
+        self.count = 0
+
+
+class SpillHistory(RingHistory):
+    """A ring of recent events plus a compact on-disk log of every event."""
+
+    mode = "spill"
+
+    def __init__(self, path, size=DEFAULT_HISTORY_SIZE):
+        super().__init__(size)
+        self.path = path
+        self.writer = BinaryTraceWriter(path, address_width=8, with_kinds=True)
+        self.pending_addresses = array("q")
+        self.pending_outcomes = bytearray()
+
+    def record(self, address, hit):
+        super().record(address, hit)
+        self.pending_addresses.append(address)
+        self.pending_outcomes.append(hit)
+        if len(self.pending_outcomes) >= self.size:
+            self.flush()
+
+    def record_batch(self, addresses, hit_mask):
+        self.flush()
+        super().record_batch(addresses, hit_mask)
+        self.writer.write(addresses, hit_mask)
+
+    def flush(self):
+        if self.pending_outcomes:
+            self.writer.write(self.pending_addresses, self.pending_outcomes)
+            self.pending_addresses = array("q")
+            self.pending_outcomes = bytearray()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def make_history(mode="full", size=DEFAULT_HISTORY_SIZE, path=None):
+    if mode == "full":
+        return FullHistory()
+    if mode == "off":
+        return History()
+    if mode == "counters":
+        return CounterHistory()
+    if mode == "ring":
+        return RingHistory(size)
+    if mode == "spill":
+        if path is None:
+            raise ValueError("Spilling history needs a log file path!")
+        return SpillHistory(path, size)
+    raise ValueError(f"Unknown history mode: {mode}")
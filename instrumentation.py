@@ -0,0 +1,171 @@
+"""Observers of CacheSimulator events and the profiles built from them.
+
+Attach observers with CacheSimulator.add_observer(). A simulator without observers pays one
+empty-list test per access; with observers it takes the scalar path even where a batch
+kernel exists, so every access is reported.
+
+Built-in collectors:
+
+- ReuseDistanceHistogram: stack distances of block reuses, in power-of-two buckets
+- EvictionAgeHistogram: how long evicted blocks lived, and how long they sat unused
+- MissClassifier: compulsory, capacity and conflict misses (the "3C" model)
+- ConflictHeatmap: a MissClassifier that also counts misses and conflict misses per set
+"""
+from array import array
+from collections import Counter
+
+from stack_distance import StackDistanceAnalyzer
+
+MISS_KINDS = ("compulsory", "capacity", "conflict")
+
+
+class Observer:
+    """Base class: every hook does nothing. ``line`` is the cache line the access landed in."""
+
+    def attach(self, simulator):
+        """Called once by CacheSimulator.add_observer()."""
+
+    def on_hit(self, simulator, address, line):
+        pass
+
+    def on_miss(self, simulator, address, line):
+        pass
+
+    def on_evict(self, simulator, line, tag):
+        """Called before on_miss() when the miss pushed ``tag`` out of ``line``."""
+
+
+def set_of_line(simulator, line):
+    """Return the set a cache line belongs to (a fully associative cache is one set)."""
+    if simulator.mapping == "Set Associative":
+        return line // simulator.associativity
+    if simulator.mapping == "Fully Associative":
+        return 0
+    return line
+
+
+def line_slots(simulator):
+    """Return how many line numbers accesses can land in (direct mapping may index past num_lines)."""
+    if simulator.mapping == "Direct Mapping":
+        return max(simulator.num_lines, 1 << simulator.index_bits)
+    return simulator.num_lines
+
+
+def bucket_ranges(buckets):
+    """Turn power-of-two buckets (bucket b counts values v with v.bit_length() == b) into (low, high, count)."""
+    return [(0 if bucket == 0 else 1 << (bucket - 1), (1 << bucket) - 1, count)
+            for bucket, count in enumerate(buckets) if count]
+
+
+class ReuseDistanceHistogram(Observer):
+    """Stack distances: distinct blocks touched between two accesses to the same block.
+
+    A reuse at distance d hits in a fully associative LRU cache of more than d lines.
+    """
+
+    def attach(self, simulator):
+        self.analyzer = StackDistanceAnalyzer(simulator.memory_size, simulator.block_size)
+
+    def on_hit(self, simulator, address, line):
+        self.analyzer.access(address)
+
+    on_miss = on_hit
+
+    @property
+    def first_touches(self):
+        return self.analyzer.cold_misses
+
+    def histogram(self):
+        """Return ``(low, high, count)`` for every non-empty distance range."""
+        return bucket_ranges(self.analyzer.distance_buckets)
+
+
+class EvictionAgeHistogram(Observer):
+    """Ages of evicted blocks, in accesses: since they were filled and since their last use."""
+
+    def attach(self, simulator):
+        self.fill_time = array("q", [0]) * line_slots(simulator)
+        self.last_use = array("q", [0]) * line_slots(simulator)
+        self.age_buckets = [0] * 65
+        self.idle_buckets = [0] * 65
+
+    def on_hit(self, simulator, address, line):
+        self.last_use[line] = simulator.hits + simulator.misses
+
+    def on_miss(self, simulator, address, line):
+        now = simulator.hits + simulator.misses
+        self.fill_time[line] = now
+        self.last_use[line] = now
+
+    def on_evict(self, simulator, line, tag):
+        now = simulator.hits + simulator.misses
+        self.age_buckets[(now - self.fill_time[line]).bit_length()] += 1
+        self.idle_buckets[(now - self.last_use[line]).bit_length()] += 1
+
+    def ages(self):
+        """Return ``(low, high, count)`` ranges of accesses between fill and eviction."""
+        return bucket_ranges(self.age_buckets)
+
+    def idle_times(self):
+        """Return ``(low, high, count)`` ranges of accesses between last use and eviction."""
+        return bucket_ranges(self.idle_buckets)
+
+
+class MissClassifier(Observer):
+    """Sorts misses into the three Cs.
+
+    Compulsory: the block was never accessed before. Capacity: a fully associative LRU cache
+    with as many lines would have missed too. Conflict: any other miss, caused by the mapping
+    or the replacement policy.
+    """
+
+    def attach(self, simulator):
+        self.analyzer = StackDistanceAnalyzer(simulator.memory_size, simulator.block_size)
+        self.lines = simulator.num_lines
+        self.counts = Counter({kind: 0 for kind in MISS_KINDS})
+
+    def on_hit(self, simulator, address, line):
+        self.analyzer.access(address)
+
+    def on_miss(self, simulator, address, line):
+        self.record(simulator, line, self.classify(address))
+
+    def classify(self, address):
+        distance = self.analyzer.access(address)
+        if distance is None:
+            return "compulsory"
+        if distance >= self.lines:
+            return "capacity"
+        return "conflict"
+
+    def record(self, simulator, line, kind):
+        self.counts[kind] += 1
+
+
+class ConflictHeatmap(MissClassifier):
+    """A MissClassifier that also keeps per-set miss and conflict-miss counts."""
+
+    def attach(self, simulator):
+        super().attach(simulator)
+        sets = simulator.num_sets if simulator.mapping == "Set Associative" else set_of_line(
+            simulator, line_slots(simulator) - 1) + 1
+        self.misses_per_set = array("q", [0]) * sets
+        self.conflicts_per_set = array("q", [0]) * sets
+        # Largest per-set conflict count, e.g. to scale a heatmap's colours
+        self.peak_conflicts = 0
+
+    def record(self, simulator, line, kind):
+        super().record(simulator, line, kind)
+        set_index = set_of_line(simulator, line)
+        self.misses_per_set[set_index] += 1
+        if kind == "conflict":
+            conflicts = self.conflicts_per_set[set_index] + 1
+            self.conflicts_per_set[set_index] = conflicts
+            if conflicts > self.peak_conflicts:
+                self.peak_conflicts = conflicts
+
+    def hottest(self, count=10):
+        """Return up to ``count`` ``(set, conflict misses, misses)`` for the sets with the most conflicts."""
+        ranked = sorted(range(len(self.conflicts_per_set)), key=self.conflicts_per_set.__getitem__, reverse=True)
+        return [(set_index, self.conflicts_per_set[set_index], self.misses_per_set[set_index])
+                for set_index in ranked[:count] if self.conflicts_per_set[set_index]]
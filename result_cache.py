@@ -0,0 +1,212 @@
+"""Persistent, size-bounded cache of trace simulation results.
+
+A result is keyed by a SHA-256 of the trace content, the format it is parsed as, and the
+simulated configuration (memory_size, cache_size, block_size, mapping, replacement_policy,
+associativity, seed), so rerunning a trace/configuration pair returns the stored counters without simulating.
+Every entry is a small JSON file; when the directory grows past ``max_bytes`` the least
+recently used entries are deleted. Entries are written atomically, so concurrent runs and
+sweeps can share one directory.
+
+Hashing a trace file means reading it once; the digest is remembered in a small entry per
+path, checked against the file's size and modification time, so later runs skip even that.
+Those entries share the byte budget and the LRU eviction with the results.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+from simulator import CacheSimulator, TraceResult
+from traces import DEFAULT_CHUNK_SIZE, iter_chunks, load_addresses, resolve_format
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RESULT_CACHE_VERSION = 3
+
+DEFAULT_MAX_BYTES = 64 << 20
+
+# Read size when hashing trace files
+HASH_BLOCK_SIZE = 1 << 20
+
+DIGEST_PREFIX = "digest-"
+
+
+def default_directory():
+    """Return $CACHE_SIMULATION_RESULTS, or a directory under the user's cache directory."""
+    directory = os.environ.get("CACHE_SIMULATION_RESULTS")
+    if directory:
+        return directory
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "cache-memory-simulation")
+
+
+class ResultCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        if max_bytes <= 0:
+            raise ValueError("The result cache size must be positive!")
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def trace_digest(self, trace, trace_format="auto"):
+        """Return the SHA-256 hex digest of a trace file's bytes, or of an iterable's addresses as int64.
+
+        An iterable is read to the end, so simulate the very same addresses afterwards: pass a
+        list or array (see load()), not an iterator or an unseeded workload, which would
+        yield different addresses a second time.
+        """
+        digest = hashlib.sha256()
+        if isinstance(trace, (str, bytes, os.PathLike)):
+            path = os.path.abspath(os.fsdecode(trace))
+            status = os.stat(path)
+            stamp = [path, status.st_size, status.st_mtime_ns]
+            name = DIGEST_PREFIX + hashlib.sha256(path.encode()).hexdigest() + ".json"
+            known = self.read_json(name)
+            if known is not None and known[:3] == stamp:
+                self.touch(name)
+                return known[3]
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                    digest.update(block)
+            self.write_json(name, stamp + [digest.hexdigest()])
+            return digest.hexdigest()
+        for chunk in iter_chunks(trace, DEFAULT_CHUNK_SIZE, trace_format):
+            if np is not None:
+                digest.update(np.asarray(chunk, dtype="<i8").tobytes())
+            else:
+                digest.update(b"".join(address.to_bytes(8, "little", signed=True) for address in chunk))
+        return digest.hexdigest()
+
+    @staticmethod
+    def load(trace, trace_format="auto"):
+        """Return a trace file path unchanged, or any other trace loaded once into an ``array('q')``."""
+        if isinstance(trace, (str, bytes, os.PathLike)):
+            return trace
+        return load_addresses(trace, trace_format)
+
+    @staticmethod
+    def uses_seed(config):
+        """Return whether the seed can change a run: only RANDOM replacement draws from it."""
+        return config[4] == "RANDOM" and config[3] != "Direct Mapping"
+
+    @classmethod
+    def key(cls, digest, config, seed=None, trace_format=None):
+        """Return the entry name of a trace digest and a configuration.
+
+        ``config`` is (memory_size, cache_size, block_size, mapping, replacement_policy,
+        associativity), as produced by sweep.configurations(); ``trace_format`` is the
+        resolve_format() of the trace, since the same bytes parse differently per format.
+        """
+        memory_size, cache_size, block_size, mapping, replacement_policy, associativity = config
+        # Settings a run ignores are left out, so runs that only differ in them share an entry
+        if mapping != "Set Associative":
+            associativity = None
+        if mapping == "Direct Mapping":
+            replacement_policy = None
+        if not cls.uses_seed(config):
+            seed = None
+        fields = [RESULT_CACHE_VERSION, digest, trace_format, memory_size, cache_size, block_size, mapping,
+                  replacement_policy, associativity, seed]
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest() + ".json"
+
+    @classmethod
+    def cacheable(cls, config, seed=None):
+        # An unseeded RANDOM run gives a different result every time
+        return seed is not None or not cls.uses_seed(config)
+
+    def get(self, digest, config, seed=None, trace_format=None):
+        """Return the stored TraceResult, or None; a hit makes the entry the most recently used."""
+        name = self.key(digest, config, seed, trace_format)
+        entry = self.read_json(name)
+        if entry is None:
+            return None
+        self.touch(name)
+        return TraceResult(*entry["result"])
+
+    def put(self, digest, config, result, seed=None, trace_format=None, evict=True):
+        """Store a result. Pass ``evict=False`` when storing many and call evict() once afterwards."""
+        if not self.cacheable(config, seed):
+            return
+        entry = {"config": list(config), "seed": seed, "trace": digest, "format": trace_format,
+                 "result": list(result)}
+        self.write_json(self.key(digest, config, seed, trace_format), entry)
+        if evict:
+            self.evict()
+
+    def run(self, trace, config, seed=None, chunk_size=DEFAULT_CHUNK_SIZE, trace_format="auto", digest=None):
+        """Return the TraceResult of ``config`` over ``trace``, simulating only on a cache miss."""
+        trace = self.load(trace, trace_format)
+        digest = digest or self.trace_digest(trace, trace_format)
+        resolved = resolve_format(trace, trace_format)
+        if self.cacheable(config, seed):
+            result = self.get(digest, config, seed, resolved)
+            if result is not None:
+                return result
+        memory_size, cache_size, block_size, mapping, replacement_policy, associativity = config
+        simulator = CacheSimulator(memory_size, cache_size, block_size, mapping, replacement_policy, seed=seed,
+                                   history="off", associativity=associativity)
+        result = simulator.run_trace(trace, chunk_size, trace_format)
+        self.put(digest, config, result, seed, resolved)
+        return result
+
+    def entries(self):
+        """Return (modification time, size, name) of every stored result and digest, oldest first."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".json"):
+                    try:
+                        status = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((status.st_mtime_ns, status.st_size, entry.name))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Delete least recently used results until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, name in self.entries():
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def touch(self, name):
+        """Make an entry the most recently used."""
+        try:
+            os.utime(os.path.join(self.directory, name))
+        except OSError:
+            pass  # Evicted by another process in the meantime; what was read is still good
+
+    def read_json(self, name):
+        try:
+            with open(os.path.join(self.directory, name)) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def write_json(self, name, value):
+        # Write to a temporary file and rename, so readers never see half an entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                json.dump(value, file)
+            os.replace(temporary, os.path.join(self.directory, name))
+        except BaseException:
+            os.remove(temporary)
+            raise
@@ -0,0 +1,227 @@
+"""Sampled simulation: estimate hit and miss rates of huge traces from a fraction of them.
+
+Two schemes, both reporting a confidence interval from the spread between samples:
+
+- Periodic (SMARTS-style) sampling splits the trace into periods of ``period`` accesses.
+  Each period starts with ``warmup`` accesses that update the cache but are not counted,
+  then a measured window of ``window`` accesses; the rest of the period is skipped. The
+  cache carries its (increasingly stale) state across the skipped gaps; the warm-up
+  refreshes it before each window.
+- Set sampling simulates only the accesses to a random ``fraction`` of the sets of a
+  direct-mapped or set associative cache. Sets are independent, so the sampled sets behave
+  exactly as in a full run and there is nothing to warm up.
+
+The intervals use Student's t with one degree of freedom less than the number of samples.
+They are approximate: with few samples, or when a few windows or sets account for most
+misses (skewed workloads), they cover the true rate less often than ``confidence`` says.
+MIN_SAMPLES is the sample count below which callers should warn about this.
+"""
+import math
+import random
+import time
+from collections import namedtuple
+from statistics import NormalDist
+
+from sweep import set_mask
+from traces import DEFAULT_CHUNK_SIZE, iter_chunks
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_CONFIDENCE = 0.95
+
+# Fewer samples than this give intervals too unreliable to report without a warning
+MIN_SAMPLES = 30
+
+
+class SampleEstimate(namedtuple("SampleEstimate", ["accesses", "simulated", "samples", "miss_rate", "margin",
+                                                   "confidence", "seconds"])):
+    """Estimated rates of a sampled run.
+
+    ``accesses`` is the trace length, ``simulated`` the accesses actually simulated (warm-up
+    included) and ``margin`` the half-width of the ``confidence`` interval around the rates.
+    """
+
+    @property
+    def hit_rate(self):
+        return 1 - self.miss_rate
+
+    @property
+    def miss_rate_interval(self):
+        return max(0.0, self.miss_rate - self.margin), min(1.0, self.miss_rate + self.margin)
+
+    @property
+    def hit_rate_interval(self):
+        low, high = self.miss_rate_interval
+        return 1 - high, 1 - low
+
+    @property
+    def speedup(self):
+        """Accesses in the trace per access simulated: the expected speedup over a full run."""
+        return self.accesses / self.simulated if self.simulated else math.inf
+
+
+def z_score(confidence):
+    if not 0 < confidence < 1:
+        raise ValueError("Confidence must be between 0 and 1!")
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def t_score(confidence, degrees):
+    """Return the two-sided Student's t quantile for ``confidence`` and ``degrees`` degrees of freedom.
+
+    Exact for one and two degrees of freedom, otherwise the Cornish-Fisher expansion around
+    the normal quantile (within 0.05 of the exact value from three degrees on).
+    """
+    z = z_score(confidence)
+    p = (1 + confidence) / 2
+    if degrees == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if degrees == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    v = degrees
+    return (z + (z ** 3 + z) / (4 * v) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * v ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * v ** 3)
+            + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * v ** 4))
+
+
+def sample_periodic(simulator, trace, period, window, warmup=0, confidence=DEFAULT_CONFIDENCE,
+                    chunk_size=DEFAULT_CHUNK_SIZE, trace_format="auto"):
+    """Estimate the miss rate of ``simulator`` over ``trace`` from periodic windows.
+
+    Each complete window is one sample; the interval treats the window miss rates as
+    independent draws.
+    """
+    if window <= 0 or warmup < 0 or warmup + window > period:
+        raise ValueError("Need 0 < window and warmup + window <= period!")
+    z_score(confidence)
+    count_misses = miss_counter(simulator)
+    rates = []
+    accesses = simulated = 0
+    window_misses = 0
+    start = time.perf_counter()
+    try:
+        for chunk in iter_chunks(trace, chunk_size, trace_format):
+            length = len(chunk)
+            offset = 0
+            while offset < length:
+                phase = (accesses + offset) % period
+                if phase >= warmup + window:
+                    # Skip to the start of the next period without touching the cache
+                    offset += period - phase
+                    continue
+                measured = min(length, offset + max(0, warmup - phase))
+                stop = min(length, offset + warmup + window - phase)
+                count_misses(chunk[offset:measured])
+                window_misses += count_misses(chunk[measured:stop])
+                simulated += stop - offset
+                if phase + stop - offset == warmup + window:
+                    rates.append(window_misses / window)
+                    window_misses = 0
+                offset = stop
+            accesses += length
+    finally:
+        if np is not None and simulator.mapping == "Direct Mapping":
+            simulator.sync_kernel()
+    return estimate(rates, accesses, simulated, confidence, time.perf_counter() - start)
+
+
+def miss_counter(simulator):
+    """Return a function that simulates a slice of addresses and returns its miss count."""
+    if np is not None and simulator.mapping == "Direct Mapping":
+        def count_misses(addresses):
+            return len(addresses) - int(np.count_nonzero(simulator.access_batch(addresses, sync=False))) \
+                if len(addresses) else 0
+    else:
+        access = simulator.access_memory_address
+
+        def count_misses(addresses):
+            if hasattr(addresses, "tolist"):
+                addresses = addresses.tolist()
+            return sum(not access(address) for address in addresses)
+    return count_misses
+
+
+def estimate(rates, accesses, simulated, confidence, seconds):
+    samples = len(rates)
+    if not samples:
+        raise ValueError("The trace is too short for a single complete sample!")
+    mean = sum(rates) / samples
+    if samples > 1:
+        variance = sum((rate - mean) ** 2 for rate in rates) / (samples - 1)
+        margin = t_score(confidence, samples - 1) * math.sqrt(variance / samples)
+    else:
+        margin = math.inf
+    return SampleEstimate(accesses, simulated, samples, mean, margin, confidence, seconds)
+
+
+def sample_sets(simulator, trace, fraction, seed=None, confidence=DEFAULT_CONFIDENCE, chunk_size=DEFAULT_CHUNK_SIZE,
+                trace_format="auto"):
+    """Estimate the miss rate of ``simulator`` over ``trace`` from a random ``fraction`` of its sets.
+
+    The estimate is the ratio of misses to accesses over the sampled sets; its interval
+    comes from the spread of the per-set miss counts (ratio estimator over a simple random
+    sample of sets, with finite population correction). Caches with few sets give few
+    samples, and so only a rough interval.
+    """
+    mask = set_mask(simulator)
+    sets = mask + 1
+    count = max(1, min(sets, round(fraction * sets)))
+    selected = bytearray(sets)
+    for set_index in random.Random(seed).sample(range(sets), count):
+        selected[set_index] = 1
+    z_score(confidence)
+    offset_bits = simulator.offset_bits
+    set_accesses = [0] * sets
+    set_misses = [0] * sets
+    access = simulator.access_memory_address
+    accesses = 0
+    start = time.perf_counter()
+    batched = np is not None and simulator.mapping == "Direct Mapping"
+    if np is not None:
+        selected_mask = np.frombuffer(bytes(selected), dtype=np.uint8).astype(bool)
+        batch_accesses = np.zeros(sets, dtype=np.int64)
+        batch_misses = np.zeros(sets, dtype=np.int64)
+    try:
+        for chunk in iter_chunks(trace, chunk_size, trace_format):
+            accesses += len(chunk)
+            if np is not None:
+                chunk = np.asarray(chunk, dtype=np.int64)
+                set_indices = (chunk >> offset_bits) & mask
+                keep = selected_mask[set_indices]
+                chunk, set_indices = chunk[keep], set_indices[keep]
+                if batched:
+                    if len(chunk):
+                        hits = simulator.access_batch(chunk, sync=False)
+                        batch_accesses += np.bincount(set_indices, minlength=sets)
+                        batch_misses += np.bincount(set_indices[~hits], minlength=sets)
+                    continue
+                chunk = chunk.tolist()
+            elif hasattr(chunk, "tolist"):
+                chunk = chunk.tolist()
+            for address in chunk:
+                set_index = (address >> offset_bits) & mask
+                if selected[set_index]:
+                    set_accesses[set_index] += 1
+                    set_misses[set_index] += not access(address)
+    finally:
+        if batched:
+            simulator.sync_kernel()
+    if batched:
+        set_accesses, set_misses = batch_accesses.tolist(), batch_misses.tolist()
+    seconds = time.perf_counter() - start
+    sampled = [set_index for set_index in range(sets) if selected[set_index]]
+    total_accesses = sum(set_accesses[set_index] for set_index in sampled)
+    if not total_accesses:
+        raise ValueError("No access touched the sampled sets!")
+    ratio = sum(set_misses[set_index] for set_index in sampled) / total_accesses
+    if count > 1:
+        mean_accesses = total_accesses / count
+        residuals = sum((set_misses[set_index] - ratio * set_accesses[set_index]) ** 2 for set_index in sampled)
+        variance = (1 - count / sets) * residuals / (count - 1) / (count * mean_accesses ** 2)
+        margin = t_score(confidence, count - 1) * math.sqrt(variance)
+    else:
+        margin = math.inf
+    return SampleEstimate(accesses, total_accesses, count, ratio, margin, confidence, seconds)
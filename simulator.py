@@ -0,0 +1,575 @@
+"""The cache simulation engine, free of any GUI dependency.
+
+cache.py builds the PyQt5 front end on top of it; headless code (the CLI, sweep and
+sharding workers, benchmarks) imports this module and never loads Qt.
+"""
+import random
+from array import array
+from collections import OrderedDict, Counter, namedtuple
+
+from history import DEFAULT_HISTORY_SIZE, format_event, make_history
+from traces import DEFAULT_CHUNK_SIZE, iter_chunks
+
+try:
+    import numpy as np
+    from vectorized import DirectMappedKernel
+except ImportError:  # NumPy is optional, the scalar path covers every mapping
+    np = None
+
+MAPPINGS = ("Direct Mapping", "Fully Associative", "Set Associative")
+REPLACEMENT_POLICIES = ("LRU", "FIFO", "RANDOM", "LFU", "MRU")
+
+# way_tags value of an invalid set associative way
+EMPTY_WAY = -1
+
+
+class TraceResult(namedtuple("TraceResult", ["accesses", "hits", "misses", "evictions"])):
+    """Aggregate counters of a headless trace run."""
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.accesses if self.accesses else 0.0
+
+    @property
+    def miss_rate(self):
+        return self.misses / self.accesses if self.accesses else 0.0
+
+
+class CacheSimulator:
+    def __init__(self, memory_size, cache_size, block_size, mapping, replacement_policy, seed=None,
+                 history="full", history_size=DEFAULT_HISTORY_SIZE, history_path=None, associativity=2):
+        if mapping not in MAPPINGS:
+            raise ValueError(f"Unknown mapping: {mapping}")
+        if replacement_policy not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy: {replacement_policy}")
+        self.memory_size = memory_size
+        self.cache_size = cache_size
+        self.block_size = block_size
+        self.cache_size = min(memory_size, cache_size)
+        self.index_max = cache_size // block_size - 1
+        self.num_lines = self.cache_size // self.block_size
+        self.index_bits = len(bin(self.cache_size // self.block_size - 1)[2:])
+        self.offset_bits = len(bin(self.block_size - 1)[2:])
+        self.associativity = associativity
+        self.num_sets = 1 if mapping == "Fully Associative" else self.num_lines
+        if mapping == "Set Associative":
+            if associativity <= 0 or self.num_lines % associativity:
+                raise ValueError(f"{self.num_lines} cache lines cannot be split into {associativity}-way sets!")
+            self.num_sets = self.num_lines // associativity
+            if self.num_sets & (self.num_sets - 1):
+                raise ValueError("The number of sets must be a power of two!")
+            # The index selects a set; line = set * associativity + way
+            self.index_bits = (self.num_sets - 1).bit_length()
+        self.tag_bits = 32 - self.index_bits - self.offset_bits
+        self.mapping = mapping
+        self.replacement_policy = replacement_policy
+        self.rng = random.Random(seed)
+        # Slot -> tag. For LRU/MRU the order is recency, for FIFO insertion order.
+        self.cache = OrderedDict()
+        self.usage_count = Counter()
+        # Fully associative bookkeeping, all O(1) per access:
+        #   tag_slots          tag -> slot holding it
+        #   free_slots         stack of empty slots, lowest slot on top
+        #   frequency_buckets  LFU: use count -> slots with that count, oldest first
+        #   random_slots       RANDOM: occupied slots, swap-removed on eviction
+        self.tag_slots = {}
+        self.free_slots = list(range(self.num_lines - 1, -1, -1)) if mapping == "Fully Associative" else []
+        self.frequency_buckets = {}
+        self.min_frequency = 0
+        self.random_slots = []
+        self.random_positions = {}
+        # Set associative state, one entry per line in flat arrays:
+        #   way_tags    tag held by the way, EMPTY_WAY if invalid
+        #   way_stamps  clock value of the last use (LRU, MRU, LFU ties) or of the fill (FIFO)
+        #   way_counts  LFU use count
+        if mapping == "Set Associative":
+            self.way_tags = array("q", [EMPTY_WAY]) * self.num_lines
+            self.way_stamps = array("q", [0]) * self.num_lines
+            self.way_counts = array("q", [0]) * self.num_lines
+        else:
+            self.way_tags = self.way_stamps = self.way_counts = None
+        self.clock = 0
+        self.current_set = 0
+        # Direct-mapped batch state, rebuilt from self.cache whenever the scalar path changed a line
+        self.kernel = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_index = 0
+        self.current_tag = 0
+        # Tag pushed out by the latest miss, or None if that miss filled an empty line
+        self.evicted_tag = None
+        # See history.py for the modes; "off" skips per-access recording entirely
+        self.history = make_history(history, history_size, history_path)
+        self.record_history = history != "off"
+        # instrumentation.Observer instances; an empty list costs one test per access
+        self.observers = []
+
+    @property
+    def hit_instructions(self):
+        return self.history.hit_instructions
+
+    @property
+    def miss_instructions(self):
+        return self.history.miss_instructions
+
+    @property
+    def sample_text(self):
+        return self.history.text()
+
+    @property
+    def current_text(self):
+        last = self.history.last
+        return format_event(*last) if last is not None else ""
+
+    def close(self):
+        """Flush and close the history log, if any."""
+        self.history.close()
+
+    def add_observer(self, observer):
+        """Report every hit, miss and eviction from now on to an instrumentation.Observer."""
+        observer.attach(self)
+        self.observers.append(observer)
+        return observer
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
+    def hit(self, address, index, tag):
+        if self.mapping == "Fully Associative":
+            self.touch(index)
+        elif self.mapping == "Set Associative":
+            self.touch_way(index)
+        self.hits += 1
+        if self.record_history:
+            self.history.record(address, True)
+        if self.observers:
+            for observer in self.observers:
+                observer.on_hit(self, address, index)
+
+    def miss(self, address, index, tag):
+        self.misses += 1
+        if self.record_history:
+            self.history.record(address, False)
+        self.place(index, tag)
+        if self.observers:
+            for observer in self.observers:
+                observer.on_miss(self, address, self.current_index)
+
+    def place(self, index, tag):
+        """Put a missing tag into the cache, evicting a victim if needed, as on a miss."""
+        if self.mapping == "Direct Mapping":
+            # The line at this index is the only candidate, whatever the replacement policy
+            self.evicted_tag = self.cache.get(index)
+            if self.evicted_tag is not None:
+                self.evictions += 1
+            self.cache[index] = tag
+            self.kernel = None
+        elif self.mapping == "Set Associative":
+            line = self.choose_way(self.current_set)
+            evicted = self.way_tags[line]
+            self.evicted_tag = None if evicted == EMPTY_WAY else evicted
+            if self.evicted_tag is not None:
+                self.evictions += 1
+            self.clock += 1
+            self.way_tags[line] = tag
+            self.way_stamps[line] = self.clock
+            self.way_counts[line] = 1
+            self.current_index = line
+        else:
+            self.evicted_tag = None
+            if not self.free_slots:
+                self.evictions += 1
+                self.evict()
+            self.current_index = self.insert(tag)
+        if self.observers and self.evicted_tag is not None:
+            for observer in self.observers:
+                observer.on_evict(self, self.current_index, self.evicted_tag)
+
+    def access_memory_address(self, address):
+        """Simulate one access and return True on a hit.
+
+        Afterwards current_index is the cache line the address maps to (the only line whose
+        contents can have changed).
+        """
+        if address < 0 or address >= self.memory_size:
+            raise ValueError(f"Invalid memory address: {hex(address)}")
+        self.get_index_and_tag(address)
+        index = self.current_index
+        tag = self.current_tag
+        if self.mapping == "Direct Mapping":
+            if self.cache.get(index) == tag:
+                self.hit(address, index, tag)
+                return True
+            self.miss(address, index, tag)
+            return False
+
+        elif self.mapping == "Fully Associative":
+            if tag in self.tag_slots:
+                self.hit(address, index, tag)
+                return True
+            self.miss(address, index, tag)
+            return False
+
+        else:
+            if index is not None:
+                self.hit(address, index, tag)
+                return True
+            self.miss(address, index, tag)
+            return False
+
+    def access_batch(self, addresses, sync=True, hit_mask=True):
+        """Simulate a batch of addresses with the NumPy kernel and return the per-access hit mask.
+
+        Only direct mapping has a batch kernel; it must give the same counters, history and
+        final cache contents as calling access_memory_address() per address.
+        With ``sync`` false the kernel stays ahead of self.cache until sync_kernel() is called.
+        With ``hit_mask`` false (and no history recorded) None is returned instead of the mask.
+        While observers are attached every address takes the scalar path, so they see each event.
+        """
+        if np is None or self.mapping != "Direct Mapping":
+            raise ValueError(f"No batch kernel for {self.mapping}")
+        if self.observers:
+            self.sync_kernel()
+            self.kernel = None
+            access = self.access_memory_address
+            return np.fromiter((access(address) for address in np.asarray(addresses).tolist()), dtype=bool)
+        addresses = np.asarray(addresses, dtype=np.int64)
+        if len(addresses) == 0:
+            return np.zeros(0, dtype=bool)
+        # Two reductions find out whether anything is out of range without a temporary mask
+        if addresses.min() < 0 or addresses.max() >= self.memory_size:
+            invalid = np.flatnonzero((addresses < 0) | (addresses >= self.memory_size))
+            # Like the scalar path, everything before the bad address is still simulated
+            self.access_batch(addresses[:invalid[0]], sync)
+            raise ValueError(f"Invalid memory address: {hex(int(addresses[invalid[0]]))}")
+        if self.kernel is None:
+            self.kernel = DirectMappedKernel(self.index_bits, self.offset_bits, self.cache)
+        result = self.kernel.access(addresses, hit_mask or self.record_history)
+        if sync:
+            changed = self.kernel.changed_lines
+            self.cache.update(zip(changed.tolist(), self.kernel.line_tags(changed).tolist()))
+        self.hits += result.hits
+        self.misses += result.misses
+        self.evictions += result.evictions
+        if self.record_history:
+            self.history.record_batch(addresses, result.hit_mask)
+        self.get_index_and_tag(int(addresses[-1]))
+        return result.hit_mask
+
+    def sync_kernel(self):
+        """Copy the batch kernel's lines back into self.cache."""
+        if self.kernel is not None:
+            valid = self.kernel.valid_lines()
+            self.cache.update(zip(valid.tolist(), self.kernel.line_tags(valid).tolist()))
+
+    def run_trace(self, trace, chunk_size=DEFAULT_CHUNK_SIZE, trace_format="auto", vectorized=True,
+                  start=0, on_chunk=None):
+        """Stream a trace (path or iterable of addresses) through the cache in chunks.
+
+        Direct mapping uses the NumPy batch kernel when NumPy is installed and ``vectorized``
+        is true; otherwise every address goes through the scalar path.
+        The first ``start`` addresses are skipped, e.g. when resuming from a checkpoint, and
+        ``on_chunk(position)`` is called after every chunk with the trace position reached.
+        Returns a TraceResult with the counters accumulated by this run only.
+        """
+        hits, misses, evictions = self.hits, self.misses, self.evictions
+        batch = vectorized and np is not None and self.mapping == "Direct Mapping" and not self.observers
+        access = self.access_memory_address
+        position = start
+        try:
+            for chunk in iter_chunks(trace, chunk_size, trace_format, start):
+                if batch:
+                    self.access_batch(chunk, sync=False, hit_mask=False)
+                else:
+                    if hasattr(chunk, "tolist"):
+                        chunk = chunk.tolist()
+                    for address in chunk:
+                        access(address)
+                position += len(chunk)
+                if on_chunk is not None:
+                    on_chunk(position)
+        finally:
+            if batch:
+                self.sync_kernel()
+        return TraceResult(self.hits + self.misses - hits - misses, self.hits - hits,
+                           self.misses - misses, self.evictions - evictions)
+
+    def get_state(self):
+        """Return a picklable snapshot of everything that decides the rest of a run.
+
+        The history is not part of it; it is a log of the past, not input to the future.
+        """
+        self.sync_kernel()
+        return {
+            "config": (self.memory_size, self.cache_size, self.block_size, self.mapping,
+                       self.replacement_policy),
+            "cache": list(self.cache.items()),
+            "usage_count": dict(self.usage_count),
+            "free_slots": list(self.free_slots),
+            "frequency_buckets": [(frequency, list(bucket)) for frequency, bucket in self.frequency_buckets.items()],
+            "min_frequency": self.min_frequency,
+            "random_slots": list(self.random_slots),
+            "associativity": self.associativity,
+            "ways": (array("q", self.way_tags), array("q", self.way_stamps), array("q", self.way_counts),
+                     self.clock) if self.way_tags is not None else None,
+            "current_set": self.current_set,
+            "counters": (self.hits, self.misses, self.evictions),
+            "current": (self.current_index, self.current_tag, self.evicted_tag),
+            "rng": self.rng.getstate(),
+        }
+
+    def set_state(self, state):
+        """Restore a snapshot taken by get_state() from a simulator with the same configuration."""
+        config = (self.memory_size, self.cache_size, self.block_size, self.mapping, self.replacement_policy)
+        if tuple(state["config"]) != config or (self.mapping == "Set Associative"
+                                                and state["associativity"] != self.associativity):
+            raise ValueError(f"Snapshot of {state['config']} does not fit a {config} cache")
+        self.cache = OrderedDict(state["cache"])
+        self.usage_count = Counter(state["usage_count"])
+        self.free_slots = list(state["free_slots"]) if self.mapping == "Fully Associative" else []
+        self.frequency_buckets = {frequency: OrderedDict.fromkeys(slots)
+                                  for frequency, slots in state["frequency_buckets"]}
+        self.min_frequency = state["min_frequency"]
+        self.random_slots = list(state["random_slots"])
+        self.random_positions = {slot: position for position, slot in enumerate(self.random_slots)}
+        self.tag_slots = {tag: slot for slot, tag in self.cache.items()} \
+            if self.mapping == "Fully Associative" else {}
+        if state["ways"] is not None:
+            way_tags, way_stamps, way_counts, self.clock = state["ways"]
+            self.way_tags, self.way_stamps, self.way_counts = array("q", way_tags), array("q", way_stamps), \
+                array("q", way_counts)
+        self.current_set = state["current_set"]
+        self.hits, self.misses, self.evictions = state["counters"]
+        self.current_index, self.current_tag, self.evicted_tag = state["current"]
+        self.rng.setstate(state["rng"])
+        self.kernel = None
+
+    @classmethod
+    def from_state(cls, state, **kwargs):
+        """Build a simulator from a get_state() snapshot; ``kwargs`` go to the constructor."""
+        simulator = cls(*state["config"], associativity=state["associativity"], **kwargs)
+        simulator.set_state(state)
+        return simulator
+
+    def line_tag(self, line):
+        """Return the tag held by a cache line, or None if the line is invalid."""
+        if self.way_tags is not None:
+            tag = self.way_tags[line]
+            return None if tag == EMPTY_WAY else tag
+        return self.cache.get(line)
+
+    def set_line(self, line, tag):
+        """Overwrite the tag held by a cache line (None invalidates it), leaving replacement metadata alone."""
+        if self.way_tags is not None:
+            self.way_tags[line] = EMPTY_WAY if tag is None else tag
+        elif tag is None:
+            del self.cache[line]
+        else:
+            self.cache[line] = tag
+
+    def block_address(self, line):
+        """Return the address of the first byte of the block held by a cache line, or None."""
+        tag = self.line_tag(line)
+        if tag is None:
+            return None
+        if self.mapping == "Direct Mapping":
+            return (tag << self.index_bits | line) << self.offset_bits
+        if self.mapping == "Set Associative":
+            return (tag << self.index_bits | line // self.associativity) << self.offset_bits
+        return tag << self.offset_bits
+
+    def locate(self, address):
+        """Return the line holding the block of ``address``, or None; changes no state."""
+        if self.mapping == "Direct Mapping":
+            line = (address >> self.offset_bits) & ((1 << self.index_bits) - 1)
+            return line if self.cache.get(line) == address >> (self.index_bits + self.offset_bits) else None
+        if self.mapping == "Fully Associative":
+            return self.tag_slots.get(address >> self.offset_bits)
+        start = ((address >> self.offset_bits) & (self.num_sets - 1)) * self.associativity
+        try:
+            return self.way_tags.index(address >> (self.index_bits + self.offset_bits), start,
+                                       start + self.associativity)
+        except ValueError:
+            return None
+
+    def invalidate(self, address):
+        """Drop the block of ``address`` from the cache; return whether it was there.
+
+        Used by cache hierarchies for back-invalidation and exclusive moves; no counter changes.
+        """
+        line = self.locate(address)
+        if line is None:
+            return False
+        if self.mapping == "Direct Mapping":
+            del self.cache[line]
+            self.kernel = None
+        elif self.mapping == "Set Associative":
+            self.way_tags[line] = EMPTY_WAY
+            self.way_stamps[line] = 0
+            self.way_counts[line] = 0
+        else:
+            del self.tag_slots[self.cache.pop(line)]
+            if self.replacement_policy == "LFU":
+                frequency = self.usage_count.pop(line)
+                bucket = self.frequency_buckets[frequency]
+                del bucket[line]
+                if not bucket:
+                    del self.frequency_buckets[frequency]
+                    if self.min_frequency == frequency:
+                        self.min_frequency = min(self.frequency_buckets, default=0)
+            elif self.replacement_policy == "RANDOM":
+                position = self.random_positions.pop(line)
+                last = self.random_slots.pop()
+                if last != line:
+                    self.random_slots[position] = last
+                    self.random_positions[last] = position
+            self.free_slots.append(line)
+        return True
+
+    def fill(self, address):
+        """Insert the block of ``address`` as a miss would, without counting an access.
+
+        Returns the address of the block it evicted, or None. Used by exclusive hierarchies to
+        move a victim down a level; a block already present is left alone.
+        """
+        if self.locate(address) is not None:
+            return None
+        self.get_index_and_tag(address)
+        self.place(self.current_index, self.current_tag)
+        return self.evicted_address()
+
+    def evicted_address(self):
+        """Return the address of the block pushed out by the latest miss, or None."""
+        if self.evicted_tag is None:
+            return None
+        if self.mapping == "Direct Mapping":
+            return (self.evicted_tag << self.index_bits | self.current_index) << self.offset_bits
+        if self.mapping == "Set Associative":
+            return (self.evicted_tag << self.index_bits | self.current_set) << self.offset_bits
+        return self.evicted_tag << self.offset_bits
+
+    def find_unused_index(self):
+        return self.free_slots[-1] if self.free_slots else None
+
+    def touch(self, slot):
+        """Update the replacement metadata of a fully associative slot on a hit."""
+        if self.replacement_policy == "LRU" or self.replacement_policy == "MRU":
+            self.cache.move_to_end(slot)
+        elif self.replacement_policy == "LFU":
+            frequency = self.usage_count[slot]
+            bucket = self.frequency_buckets[frequency]
+            del bucket[slot]
+            if not bucket:
+                del self.frequency_buckets[frequency]
+                if self.min_frequency == frequency:
+                    self.min_frequency = frequency + 1
+            self.usage_count[slot] = frequency + 1
+            self.frequency_buckets.setdefault(frequency + 1, OrderedDict())[slot] = None
+
+    def insert(self, tag):
+        """Place a tag in the next free fully associative slot and return that slot."""
+        slot = self.free_slots.pop()
+        self.cache[slot] = tag
+        self.tag_slots[tag] = slot
+        if self.replacement_policy == "LFU":
+            self.usage_count[slot] = 1
+            self.frequency_buckets.setdefault(1, OrderedDict())[slot] = None
+            self.min_frequency = 1
+        elif self.replacement_policy == "RANDOM":
+            self.random_positions[slot] = len(self.random_slots)
+            self.random_slots.append(slot)
+        return slot
+
+    def evict(self):
+        """Evict one item from the cache based on the selected replacement policy.
+
+        The freed slot goes back to the free-slot pool and is returned.
+        """
+        if not self.cache:
+            raise ValueError("Cache is empty, cannot evict.")
+        if self.replacement_policy == "LRU" or self.replacement_policy == "FIFO":
+            slot, tag = self.cache.popitem(last=False)
+        elif self.replacement_policy == "MRU":
+            slot, tag = self.cache.popitem(last=True)
+        elif self.replacement_policy == "LFU":
+            bucket = self.frequency_buckets[self.min_frequency]
+            slot, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.frequency_buckets[self.min_frequency]
+            del self.usage_count[slot]
+            tag = self.cache.pop(slot)
+        elif self.replacement_policy == "RANDOM":
+            position = self.rng.randrange(len(self.random_slots))
+            slot = self.random_slots[position]
+            last = self.random_slots.pop()
+            if last != slot:
+                self.random_slots[position] = last
+                self.random_positions[last] = position
+            del self.random_positions[slot]
+            tag = self.cache.pop(slot)
+        else:
+            raise ValueError(f"Unknown replacement policy: {self.replacement_policy}")
+        del self.tag_slots[tag]
+        self.free_slots.append(slot)
+        self.evicted_tag = tag
+        return slot
+
+    def touch_way(self, line):
+        """Update the replacement metadata of a set associative way on a hit."""
+        if self.replacement_policy == "LRU" or self.replacement_policy == "MRU":
+            self.clock += 1
+            self.way_stamps[line] = self.clock
+        elif self.replacement_policy == "LFU":
+            self.clock += 1
+            self.way_stamps[line] = self.clock
+            self.way_counts[line] += 1
+
+    def choose_way(self, set_index):
+        """Return the line a miss in ``set_index`` fills: the first invalid way, else the policy's victim.
+
+        Within a set this picks the same victim as the fully associative policies: LFU ties go
+        to the way that reached its count first.
+        """
+        start = set_index * self.associativity
+        stop = start + self.associativity
+        try:
+            return self.way_tags.index(EMPTY_WAY, start, stop)
+        except ValueError:
+            pass
+        stamps = self.way_stamps
+        if self.replacement_policy == "LRU" or self.replacement_policy == "FIFO":
+            return min(range(start, stop), key=stamps.__getitem__)
+        if self.replacement_policy == "MRU":
+            return max(range(start, stop), key=stamps.__getitem__)
+        if self.replacement_policy == "LFU":
+            counts = self.way_counts
+            return min(range(start, stop), key=lambda line: (counts[line], stamps[line]))
+        if self.replacement_policy == "RANDOM":
+            return start + self.rng.randrange(self.associativity)
+        raise ValueError(f"Unknown replacement policy: {self.replacement_policy}")
+
+    def get_index_and_tag(self, address):
+        tag = 0
+        index = 0
+        if self.mapping == "Direct Mapping":
+            tag = address >> (self.index_bits + self.offset_bits)
+            index = (address >> self.offset_bits) & ((1 << self.index_bits) - 1)
+        elif self.mapping == "Fully Associative":
+            tag = address >> self.offset_bits
+            index = self.tag_slots.get(tag)
+            if index is None:
+                index = self.find_unused_index()
+        elif self.mapping == "Set Associative":
+            # index is the way holding the tag, or None on a miss
+            set_index = (address >> self.offset_bits) & (self.num_sets - 1)
+            tag = address >> (self.index_bits + self.offset_bits)
+            start = set_index * self.associativity
+            try:
+                index = self.way_tags.index(tag, start, start + self.associativity)
+            except ValueError:
+                index = None
+            self.current_set = set_index
+
+        self.current_index = index
+        self.current_tag = tag
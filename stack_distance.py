@@ -0,0 +1,102 @@
+"""Single-pass LRU analysis: hit/miss counts for every power-of-two cache size at once.
+
+A fully associative LRU cache of L lines hits exactly when fewer than L distinct blocks
+were touched since the previous access to the same block (the stack distance). The
+distances come from a Fenwick tree over access times in which only the latest access of
+each block is marked, so every access costs O(log n).
+"""
+from collections import namedtuple
+
+from traces import DEFAULT_CHUNK_SIZE, iter_chunks
+
+SizeResult = namedtuple("SizeResult", ["cache_size", "lines", "hits", "misses", "evictions"])
+
+
+class StackDistanceAnalyzer:
+    def __init__(self, memory_size, block_size, capacity=1 << 16):
+        self.memory_size = memory_size
+        self.block_size = block_size
+        self.offset_bits = len(bin(block_size - 1)[2:])
+        self.capacity = capacity
+        self.tree = [0] * (capacity + 1)
+        self.last_access = {}
+        self.time = 0
+        self.accesses = 0
+        self.cold_misses = 0
+        # distance_buckets[b] counts reuses with stack distance d where d.bit_length() == b,
+        # i.e. reuses that hit in every cache of at least 2 ** b lines
+        self.distance_buckets = [0] * 65
+
+    def prefix(self, position):
+        """Number of marked access times in 1..position."""
+        tree = self.tree
+        total = 0
+        while position > 0:
+            total += tree[position]
+            position &= position - 1
+        return total
+
+    def update(self, position, delta):
+        tree = self.tree
+        capacity = self.capacity
+        while position <= capacity:
+            tree[position] += delta
+            position += position & -position
+
+    def compact(self):
+        """Renumber the live marks to 1..n so the tree never grows with the trace length."""
+        live = sorted(self.last_access, key=self.last_access.get)
+        count = len(live)
+        self.capacity = max(self.capacity, 2 * count)
+        self.last_access = {block: time for time, block in enumerate(live, 1)}
+        # Positions 1..count are marked: node i covers (i - lowbit(i), i]
+        self.tree = [0] + [max(0, min(i, count) - (i - (i & -i))) for i in range(1, self.capacity + 1)]
+        self.time = count
+
+    def access(self, address):
+        """Record one access and return its stack distance (None for a first touch)."""
+        if address < 0 or address >= self.memory_size:
+            raise ValueError(f"Invalid memory address: {hex(address)}")
+        block = address >> self.offset_bits
+        self.accesses += 1
+        if self.time == self.capacity:
+            self.compact()
+        previous = self.last_access.get(block)
+        if previous is None:
+            self.cold_misses += 1
+            distance = None
+        else:
+            distance = len(self.last_access) - self.prefix(previous)
+            self.distance_buckets[distance.bit_length()] += 1
+            self.update(previous, -1)
+        self.time += 1
+        self.update(self.time, 1)
+        self.last_access[block] = self.time
+        return distance
+
+    def run_trace(self, trace, chunk_size=DEFAULT_CHUNK_SIZE, trace_format="auto"):
+        access = self.access
+        for chunk in iter_chunks(trace, chunk_size, trace_format):
+            if hasattr(chunk, "tolist"):
+                chunk = chunk.tolist()
+            for address in chunk:
+                access(address)
+        return self.results()
+
+    def results(self):
+        """Return a SizeResult per power-of-two cache size from one block up to memory_size.
+
+        Each one matches a CacheSimulator run with mapping="Fully Associative" and
+        replacement_policy="LRU" at that cache size.
+        """
+        results = []
+        max_lines = self.memory_size // self.block_size
+        hits = 0
+        bits = 0
+        while (1 << bits) <= max_lines:
+            lines = 1 << bits
+            hits += self.distance_buckets[bits]
+            misses = self.accesses - hits
+            results.append(SizeResult(lines * self.block_size, lines, hits, misses, max(0, misses - lines)))
+            bits += 1
+        return results
@@ -0,0 +1,250 @@
+"""Parallel simulation over a process pool: design-space sweeps and set-sharded runs.
+
+A sweep runs one trace through many cache configurations. A sharded run splits one
+configuration by set: every set of a direct-mapped or set associative cache evolves
+independently, so each worker simulates only the accesses to its own sets.
+
+The trace is loaded once into shared memory; each worker attaches to it when it starts,
+so tasks only carry their configuration tuple.
+"""
+import csv
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from simulator import CacheSimulator, TraceResult
+from traces import DEFAULT_CHUNK_SIZE, SharedTrace, iter_chunks, load_addresses, resolve_format
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RESULT_FIELDS = ["memory_size", "cache_size", "block_size", "mapping", "replacement_policy", "associativity",
+                 "accesses", "hits", "misses", "evictions", "hit_rate", "miss_rate"]
+
+# Set in each worker process by attach_worker()
+worker_trace = None
+
+
+def configurations(memory_sizes, cache_sizes, block_sizes, mappings, replacement_policies, associativities=(2,)):
+    """Return the grid of (memory_size, cache_size, block_size, mapping, policy, associativity) worth simulating.
+
+    Combinations whose block does not fit in the cache or whose cache is larger than the
+    memory are skipped. Only the set associative mapping is tried with every associativity,
+    and only with those that split the lines into a power-of-two number of sets; the other
+    mappings get their fixed associativity (1 for direct mapping, all lines for fully associative).
+    Direct mapping has no replacement choice, so it is only paired with the first policy.
+    """
+    configs = []
+    for memory_size, cache_size, block_size, mapping, replacement_policy in product(
+            memory_sizes, cache_sizes, block_sizes, mappings, replacement_policies):
+        if not block_size <= cache_size <= memory_size:
+            continue
+        lines = cache_size // block_size
+        if mapping == "Direct Mapping":
+            if replacement_policy != replacement_policies[0]:
+                continue
+            ways = [1]
+        elif mapping == "Fully Associative":
+            ways = [lines]
+        else:
+            ways = [ways for ways in associativities
+                    if 0 < ways <= lines and lines % ways == 0 and is_power_of_two(lines // ways)]
+        configs.extend((memory_size, cache_size, block_size, mapping, replacement_policy, associativity)
+                       for associativity in ways)
+    return configs
+
+
+def is_power_of_two(value):
+    return value & (value - 1) == 0
+
+
+def simulate(config, trace, chunk_size=DEFAULT_CHUNK_SIZE, seed=None):
+    """Run one configuration over a trace and return its result row."""
+    memory_size, cache_size, block_size, mapping, replacement_policy, associativity = config
+    simulator = CacheSimulator(memory_size, cache_size, block_size, mapping, replacement_policy,
+                               history="off", seed=seed, associativity=associativity)
+    return result_row(config, simulator.run_trace(trace, chunk_size))
+
+
+def result_row(config, result):
+    memory_size, cache_size, block_size, mapping, replacement_policy, associativity = config
+    return {
+        "memory_size": memory_size,
+        "cache_size": cache_size,
+        "block_size": block_size,
+        "mapping": mapping,
+        "replacement_policy": replacement_policy,
+        "associativity": associativity,
+        "accesses": result.accesses,
+        "hits": result.hits,
+        "misses": result.misses,
+        "evictions": result.evictions,
+        "hit_rate": result.hit_rate,
+        "miss_rate": result.miss_rate,
+    }
+
+
+def attach_worker(name, length):
+    global worker_trace
+    worker_trace = SharedTrace.attach(name, length)
+
+
+def simulate_shared(config, chunk_size, seed):
+    return simulate(config, worker_trace.addresses, chunk_size, seed)
+
+
+def sweep(trace, configs, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, trace_format="auto", seed=None,
+          result_cache=None):
+    """Simulate every configuration over ``trace`` and return the result rows in ``configs`` order.
+
+    ``trace`` is a path or an iterable of addresses. ``workers`` defaults to all cores;
+    with one worker everything runs in this process. Every RANDOM run is seeded with
+    ``seed``, so a seeded sweep gives the same rows whatever the worker count.
+    With a result_cache.ResultCache, stored results are reused and only the other
+    configurations are simulated (and then stored).
+    """
+    rows = [None] * len(configs)
+    addresses = None
+    if result_cache is not None:
+        if not isinstance(trace, (str, bytes, os.PathLike)):
+            # Hash and simulate the same addresses, even if ``trace`` can only be read once
+            trace = addresses = load_addresses(trace, trace_format)
+        digest = result_cache.trace_digest(trace, trace_format)
+        resolved = resolve_format(trace, trace_format)
+        for position, config in enumerate(configs):
+            if result_cache.cacheable(config, seed):
+                result = result_cache.get(digest, config, seed, resolved)
+                if result is not None:
+                    rows[position] = result_row(config, result)
+    pending = [position for position, row in enumerate(rows) if row is None]
+    if not pending:
+        return rows
+    configs_left = [configs[position] for position in pending]
+    workers = workers or os.cpu_count() or 1
+    if addresses is None:
+        addresses = load_addresses(trace, trace_format)
+    if workers == 1 or len(configs_left) <= 1:
+        simulated = [simulate(config, addresses, chunk_size, seed) for config in configs_left]
+    else:
+        with SharedTrace.create(addresses) as shared:
+            addresses = trace = None  # Only the shared copy is needed from here on
+            with ProcessPoolExecutor(max_workers=min(workers, len(configs_left)), initializer=attach_worker,
+                                     initargs=(shared.name, len(shared))) as executor:
+                simulated = list(executor.map(simulate_shared, configs_left, [chunk_size] * len(configs_left),
+                                              [seed] * len(configs_left)))
+    for position, row in zip(pending, simulated):
+        rows[position] = row
+        if result_cache is not None:
+            result = TraceResult(row["accesses"], row["hits"], row["misses"], row["evictions"])
+            result_cache.put(digest, configs[position], result, seed, resolved, evict=False)
+    if result_cache is not None:
+        result_cache.evict()
+    return rows
+
+
+def set_mask(simulator):
+    """Return the mask that, applied to ``address >> offset_bits``, gives the set an address maps to."""
+    if simulator.mapping == "Direct Mapping":
+        return (1 << simulator.index_bits) - 1
+    if simulator.mapping == "Set Associative":
+        return simulator.num_sets - 1
+    raise ValueError(f"{simulator.mapping} has a single set and cannot be sharded")
+
+
+def shard_positions(addresses, offset_bits, mask, shard, shards):
+    """Return the trace positions whose set belongs to ``shard`` (sets are dealt out round-robin)."""
+    if np is not None:
+        addresses = np.asarray(addresses, dtype=np.int64)
+        return np.flatnonzero(((addresses >> offset_bits) & mask) % shards == shard)
+    return array("q", (position for position, address in enumerate(addresses)
+                       if ((address >> offset_bits) & mask) % shards == shard))
+
+
+def simulate_shard(config, addresses, shard, shards, chunk_size=DEFAULT_CHUNK_SIZE, seed=None, outcomes=False):
+    """Simulate the accesses of one shard; return its TraceResult and, with ``outcomes``, its hit flags.
+
+    The hit flags are in trace order over the shard's accesses only.
+    """
+    memory_size, cache_size, block_size, mapping, replacement_policy, associativity = config
+    simulator = CacheSimulator(memory_size, cache_size, block_size, mapping, replacement_policy,
+                               history="off", seed=seed, associativity=associativity)
+    positions = shard_positions(addresses, simulator.offset_bits, set_mask(simulator), shard, shards)
+    if np is not None:
+        selected = np.asarray(addresses, dtype=np.int64)[positions]
+    else:
+        selected = array("q", (addresses[position] for position in positions))
+    if not outcomes:
+        return simulator.run_trace(selected, chunk_size), None
+    hit_flags = bytearray()
+    batch = np is not None and mapping == "Direct Mapping"
+    access = simulator.access_memory_address
+    for chunk in iter_chunks(selected, chunk_size):
+        if batch:
+            hit_flags += simulator.access_batch(chunk, sync=False).tobytes()
+        else:
+            hit_flags += bytes(access(address) for address in chunk.tolist())
+    result = TraceResult(simulator.hits + simulator.misses, simulator.hits, simulator.misses, simulator.evictions)
+    return result, hit_flags
+
+
+def simulate_shared_shard(config, shard, shards, chunk_size, seed, outcomes):
+    return simulate_shard(config, worker_trace.addresses, shard, shards, chunk_size, seed, outcomes)
+
+
+def simulate_sharded(trace, config, shards=None, chunk_size=DEFAULT_CHUNK_SIZE, trace_format="auto", seed=None,
+                     outcomes=False):
+    """Simulate one configuration with its sets split over ``shards`` worker processes.
+
+    ``config`` is a (memory_size, cache_size, block_size, mapping, policy, associativity)
+    tuple as produced by configurations(); only direct mapping and set associative caches
+    can be sharded. Returns ``(result, hit_flags)``: the merged TraceResult, which matches
+    a serial run exactly for every policy but RANDOM, and with ``outcomes`` a bytearray
+    with one 0/1 hit flag per access in trace order (None otherwise).
+    """
+    probe = CacheSimulator(*config[:5], history="off", associativity=config[5])
+    mask = set_mask(probe)
+    # There is no point in more shards than sets
+    shards = max(1, min(shards or os.cpu_count() or 1, mask + 1))
+    addresses = load_addresses(trace, trace_format)
+    tasks = [(config, shard, shards, chunk_size, seed, outcomes) for shard in range(shards)]
+    if shards == 1:
+        parts = [simulate_shard(config, addresses, *task[1:]) for task in tasks]
+    else:
+        with SharedTrace.create(addresses) as shared:
+            with ProcessPoolExecutor(max_workers=shards, initializer=attach_worker,
+                                     initargs=(shared.name, len(shared))) as executor:
+                parts = list(executor.map(simulate_shared_shard, *zip(*tasks)))
+    result = TraceResult(*(sum(counters) for counters in zip(*(part for part, _ in parts))))
+    if not outcomes:
+        return result, None
+    hit_flags = bytearray(len(addresses))
+    for shard, (_, shard_flags) in enumerate(parts):
+        positions = shard_positions(addresses, probe.offset_bits, mask, shard, shards)
+        if np is not None:
+            np.frombuffer(hit_flags, dtype=np.uint8)[positions] = np.frombuffer(shard_flags, dtype=np.uint8)
+        else:
+            for position, hit in zip(positions, shard_flags):
+                hit_flags[position] = hit
+    return result, hit_flags
+
+
+def write_results(rows, path):
+    """Write result rows as CSV, or as Parquet when ``path`` ends in .parquet (needs pandas)."""
+    if str(path).endswith(".parquet"):
+        try:
+            import pandas
+        except ImportError:
+            raise ValueError("Writing Parquet needs pandas with pyarrow or fastparquet installed")
+        pandas.DataFrame(rows, columns=RESULT_FIELDS).to_parquet(path, index=False)
+        return
+    with open(path, "w", newline="") as file:
+        write_csv(rows, file)
+
+
+def write_csv(rows, file):
+    writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
@@ -0,0 +1,5 @@
+"""The simulator is a set of top-level modules, not a package: make them importable."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
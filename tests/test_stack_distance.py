@@ -0,0 +1,38 @@
+"""One stack-distance pass must reproduce a fully associative LRU run at every cache size."""
+import random
+
+import pytest
+
+from simulator import CacheSimulator
+from stack_distance import StackDistanceAnalyzer
+
+
+def random_trace(rng, memory_size, count):
+    # A hot region plus uniform noise, so every cache size sees both hits and misses
+    hot = rng.randrange(memory_size // 2)
+    return [hot + rng.randrange(memory_size // 16) if rng.random() < 0.7 else rng.randrange(memory_size)
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("capacity", [8, 1 << 16])
+@pytest.mark.parametrize("seed", range(4))
+def test_results_match_fully_associative_lru(seed, capacity):
+    rng = random.Random(seed)
+    memory_size, block_size = 1 << 12, 1 << rng.randint(2, 5)
+    trace = random_trace(rng, memory_size, 3000)
+    analyzer = StackDistanceAnalyzer(memory_size, block_size, capacity=capacity)
+    results = analyzer.run_trace(trace)
+    assert [result.cache_size for result in results] == [block_size << bits for bits in range(len(results))]
+    for result in results:
+        simulator = CacheSimulator(memory_size, result.cache_size, block_size, "Fully Associative", "LRU",
+                                   history="off")
+        expected = simulator.run_trace(trace)
+        assert (result.hits, result.misses, result.evictions) == (expected.hits, expected.misses,
+                                                                   expected.evictions)
+
+
+def test_distances_count_distinct_blocks_in_between():
+    analyzer = StackDistanceAnalyzer(1 << 10, 16)
+    distances = [analyzer.access(address) for address in (0, 16, 32, 16, 0, 0, 48)]
+    assert distances == [None, None, None, 1, 2, 0, None]
+    assert analyzer.cold_misses == 4
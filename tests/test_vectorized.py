@@ -0,0 +1,69 @@
+"""The NumPy batch kernel must agree with the scalar reference path access for access."""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from simulator import CacheSimulator  # noqa: E402
+from workloads import WORKLOADS, generate  # noqa: E402
+
+
+def run_both(addresses, memory_size, cache_size, block_size, chunk_size, history="full"):
+    batch = CacheSimulator(memory_size, cache_size, block_size, "Direct Mapping", "LRU", history=history)
+    scalar = CacheSimulator(memory_size, cache_size, block_size, "Direct Mapping", "LRU", history=history)
+    return (batch, batch.run_trace(addresses, chunk_size)), (scalar, scalar.run_trace(addresses, vectorized=False))
+
+
+@pytest.mark.parametrize("workload", WORKLOADS)
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_kernel_matches_scalar_path(workload, chunk_size):
+    rng = random.Random(f"{workload}-{chunk_size}")
+    for _ in range(5):
+        memory_size = 1 << rng.choice([12, 16, 20])
+        block_size = 1 << rng.randint(2, 6)
+        cache_size = block_size << rng.randint(0, 10)
+        addresses = generate(workload, rng.randint(0, 20000), memory_size, seed=rng.randrange(1 << 30))
+        (batch, batch_result), (scalar, scalar_result) = run_both(addresses, memory_size, cache_size, block_size,
+                                                                   chunk_size)
+        assert batch_result == scalar_result
+        assert dict(batch.cache) == dict(scalar.cache)
+        assert batch.hit_instructions == scalar.hit_instructions
+        assert batch.miss_instructions == scalar.miss_instructions
+        assert (batch.current_index, batch.current_tag) == (scalar.current_index, scalar.current_tag)
+
+
+def test_kernel_matches_scalar_path_with_wide_indices():
+    # More than 16 index bits takes the multi-digit radix sort
+    memory_size, cache_size, block_size = 1 << 26, 1 << 22, 16
+    addresses = generate("zipfian", 50000, memory_size, seed=1, footprint=1 << 20)
+    (batch, batch_result), (scalar, scalar_result) = run_both(addresses, memory_size, cache_size, block_size, 8192,
+                                                               history="ring")
+    assert batch_result == scalar_result
+    assert dict(batch.cache) == dict(scalar.cache)
+    assert batch.sample_text == scalar.sample_text
+
+
+def test_batch_continues_from_scalar_state():
+    memory_size = 1 << 16
+    addresses = generate("uniform", 6000, memory_size, seed=2)
+    batch = CacheSimulator(memory_size, 1024, 16, "Direct Mapping", "LRU", history="off")
+    scalar = CacheSimulator(memory_size, 1024, 16, "Direct Mapping", "LRU", history="off")
+    batch.run_trace(addresses[:3000], vectorized=False)
+    batch.run_trace(addresses[3000:])
+    scalar.run_trace(addresses, vectorized=False)
+    assert (batch.hits, batch.misses, batch.evictions) == (scalar.hits, scalar.misses, scalar.evictions)
+    assert dict(batch.cache) == dict(scalar.cache)
+
+
+def test_invalid_address_stops_the_batch_where_the_scalar_path_would():
+    batch = CacheSimulator(1024, 64, 16, "Direct Mapping", "LRU", history="off")
+    scalar = CacheSimulator(1024, 64, 16, "Direct Mapping", "LRU", history="off")
+    addresses = [0, 16, 32, 5000, 48]
+    with pytest.raises(ValueError):
+        batch.access_batch(np.array(addresses))
+    with pytest.raises(ValueError):
+        for address in addresses:
+            scalar.access_memory_address(address)
+    assert (batch.hits, batch.misses) == (scalar.hits, scalar.misses)
+    assert dict(batch.cache) == dict(scalar.cache)
@@ -0,0 +1,429 @@
+"""Readers that turn memory traces into streams of integer addresses.
+
+Supported inputs are any iterable of integers, plain text traces (one or more
+decimal or ``0x`` hexadecimal addresses per line, separated by commas or
+whitespace), Dinero ``din`` traces (``<label> <hex address>`` per line) and
+gzip-compressed versions of both, plus a compact binary format that is memory-mapped
+instead of parsed (see BinaryTrace).
+"""
+import gzip
+import io
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import warnings
+from array import array
+from itertools import islice
+from multiprocessing.shared_memory import SharedMemory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_CHUNK_SIZE = 65536
+
+TRACE_FORMATS = ("auto", "text", "din", "binary")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Binary trace layout: a fixed little-endian header (magic, version, address width in
+# bytes, flags, access count), the addresses as little-endian uint32/uint64, then, if
+# FLAG_ACCESS_KINDS is set, one byte per access holding its Dinero label
+# (0 read, 1 write, 2 instruction fetch).
+BINARY_MAGIC = b"CTRC"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHBBQ")
+FLAG_ACCESS_KINDS = 1
+ADDRESS_TYPECODES = {4: "I", 8: "Q"}
+
+ITEM_SIZE = array("q").itemsize
+
+# Address sequences iter_chunks() slices instead of iterating; others (deques, generators) are streamed
+SLICEABLE_TYPES = (list, tuple, range, array, memoryview) + ((np.ndarray,) if np is not None else ())
+
+# Dinero escape records: 3 unknown access type, 4 cache flush
+DIN_ESCAPE_LABELS = (3, 4)
+
+DIN_LABELS = ("0", "1", "2", "3", "4")
+
+# Non-empty lines read by detect_format() before deciding between text and din
+DETECT_LINES = 100
+
+
+def open_text(path):
+    """Open a trace file for reading text, transparently decompressing gzip."""
+    with open(path, "rb") as raw:
+        magic = raw.read(2)
+    if magic == GZIP_MAGIC:
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="ascii", errors="replace")
+    return open(path, "r", encoding="ascii", errors="replace")
+
+
+def parse_address(token):
+    if token[:2] in ("0x", "0X"):
+        return int(token, 16)
+    return int(token)
+
+
+def iter_text(lines):
+    for line in lines:
+        line = line.split("#", 1)[0]
+        for token in line.replace(",", " ").split():
+            yield parse_address(token)
+
+
+def iter_din(lines):
+    """Yield ``(label, address)`` pairs from Dinero ``din`` trace lines.
+
+    Labels follow Dinero: 0 data read, 1 data write, 2 instruction fetch. The escape
+    records 3 (unknown access type) and 4 (cache flush) are not memory accesses and are
+    skipped.
+    """
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 2 or fields[0].startswith("#"):
+            continue
+        label = int(fields[0])
+        if label in DIN_ESCAPE_LABELS:
+            continue
+        yield label, int(fields[1], 16)
+
+
+def is_din_line(fields):
+    if len(fields) != 2 or fields[0] not in DIN_LABELS:
+        return False
+    try:
+        int(fields[1], 16)
+    except ValueError:
+        return False
+    return True
+
+
+def is_text_line(line):
+    try:
+        for _ in iter_text([line]):
+            pass
+    except ValueError:
+        return False
+    return True
+
+
+def detect_format(path):
+    """Guess whether a trace is binary, ``din`` (two fields, hex address) or plain text.
+
+    A trace is ``din`` only if its first DETECT_LINES lines are all ``<label> <hex address>``
+    and at least one of them cannot be read as text (e.g. an address with hex letters).
+    Traces that read both ways are din if named ``*.din`` (or ``*.din.gz``), otherwise text,
+    with a warning.
+    """
+    with open(path, "rb") as raw:
+        if raw.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+            return "binary"
+    din_only = False
+    with open_text(path) as lines:
+        checked = 0
+        for line in lines:
+            line = line.split("#", 1)[0]
+            fields = line.split()
+            if not fields:
+                continue
+            if not is_din_line(fields):
+                return "text"
+            din_only = din_only or not is_text_line(line)
+            checked += 1
+            if checked == DETECT_LINES:
+                break
+        if not checked:
+            return "text"
+    name = os.fsdecode(path)
+    if din_only or name.endswith((".din", ".din.gz")):
+        return "din"
+    warnings.warn(f"{name} reads as both a text and a din trace; treating it as text "
+                  "(pass --format din if it is a din trace)")
+    return "text"
+
+
+def resolve_format(trace, trace_format="auto"):
+    """Return the format a trace file is parsed as, or None for iterables, whose format is unused."""
+    if not isinstance(trace, (str, bytes, os.PathLike)):
+        return None
+    if trace_format not in TRACE_FORMATS:
+        raise ValueError(f"Unknown trace format: {trace_format}")
+    return detect_format(trace) if trace_format == "auto" else trace_format
+
+
+def iter_addresses(source, trace_format="auto"):
+    """Yield integer addresses from a path or from an iterable of integers."""
+    if not isinstance(source, (str, bytes, os.PathLike)):
+        yield from source
+        return
+    if trace_format not in TRACE_FORMATS:
+        raise ValueError(f"Unknown trace format: {trace_format}")
+    if trace_format == "auto":
+        trace_format = detect_format(source)
+    if trace_format == "binary":
+        with BinaryTrace(source) as trace:
+            for chunk in trace.chunks():
+                yield from chunk.tolist()
+        return
+    with open_text(source) as lines:
+        if trace_format == "din":
+            for _, address in iter_din(lines):
+                yield address
+        else:
+            yield from iter_text(lines)
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, trace_format="auto", start=0):
+    """Yield chunks of at most ``chunk_size`` addresses from ``source``, skipping the first ``start``.
+
+    Lists, tuples, ranges, arrays, memoryviews, NumPy arrays and binary traces are sliced
+    (zero-copy for arrays and memory-mapped files), sources with their own chunks() method
+    (such as workloads.Workload) stream through it, anything else is collected into lists.
+    """
+    if chunk_size <= 0:
+        raise ValueError("Chunk size must be positive!")
+    if start < 0:
+        raise ValueError("Start position must not be negative!")
+    if hasattr(source, "chunks"):
+        yield from source.chunks(chunk_size, start)
+        return
+    if isinstance(source, (str, bytes, os.PathLike)) and trace_format in ("auto", "binary") \
+            and detect_format(source) == "binary":
+        with BinaryTrace(source) as trace:
+            yield from trace.chunks(chunk_size, start)
+        return
+    if isinstance(source, SLICEABLE_TYPES):
+        for position in range(start, len(source), chunk_size):
+            yield source[position:position + chunk_size]
+        return
+    addresses = islice(iter_addresses(source, trace_format), start, None)
+    while True:
+        chunk = list(islice(addresses, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_addresses(source, trace_format="auto"):
+    """Read a whole trace into a compact ``array('q')`` of addresses."""
+    addresses = array("q")
+    for chunk in iter_chunks(source, DEFAULT_CHUNK_SIZE, trace_format):
+        if np is not None and isinstance(chunk, np.ndarray):
+            addresses.frombytes(chunk.astype(np.int64, copy=False).tobytes())
+        else:
+            addresses.extend(chunk)
+    return addresses
+
+
+class SharedTrace:
+    """A trace held once in shared memory so worker processes can read it without pickling.
+
+    The creating process owns the segment and must call close() (or use it as a context
+    manager); workers attach by name and only ever read.
+    """
+
+    def __init__(self, shm, length, owner):
+        self.shm = shm
+        self.length = length
+        self.owner = owner
+        view = shm.buf[:length * ITEM_SIZE]
+        self.addresses = np.frombuffer(view, dtype=np.int64) if np is not None else view.cast("q")
+
+    @classmethod
+    def create(cls, addresses):
+        length = len(addresses)
+        shm = SharedMemory(create=True, size=max(1, length * ITEM_SIZE))
+        if not (isinstance(addresses, array) and addresses.typecode == "q"):
+            # int64 arrays are copied straight in; anything else is converted once
+            addresses = np.ascontiguousarray(addresses, dtype=np.int64) if np is not None else array("q", addresses)
+        shm.buf[:length * ITEM_SIZE] = memoryview(addresses).cast("B")
+        return cls(shm, length, owner=True)
+
+    @classmethod
+    def attach(cls, name, length):
+        return cls(SharedMemory(name=name), length, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return self.length
+
+    def close(self):
+        # Views into the buffer must be released before the segment can be closed
+        self.addresses = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BinaryTrace:
+    """Read-only, memory-mapped view of a binary trace file.
+
+    Nothing is parsed or loaded up front: ``addresses`` (and ``kinds`` when present) are
+    np.memmap arrays, or memoryviews over an mmap without NumPy, and slicing them or
+    calling chunks() never copies.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header = file.read(BINARY_HEADER.size)
+        if len(header) < BINARY_HEADER.size:
+            raise ValueError(f"Not a binary trace: {path}")
+        magic, version, width, flags, count = BINARY_HEADER.unpack(header)
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"Not a binary trace: {path}")
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported binary trace version: {version}")
+        if width not in ADDRESS_TYPECODES:
+            raise ValueError(f"Unsupported address width: {width}")
+        self.path = path
+        self.address_width = width
+        self.flags = flags
+        self.count = count
+        kinds_offset = BINARY_HEADER.size + count * width
+        self.mmap = None
+        if count == 0:
+            self.addresses = array(ADDRESS_TYPECODES[width])
+            self.kinds = bytes() if flags & FLAG_ACCESS_KINDS else None
+        elif np is not None:
+            self.addresses = np.memmap(path, dtype=f"<u{width}", mode="r", offset=BINARY_HEADER.size,
+                                       shape=(count,))
+            self.kinds = np.memmap(path, dtype=np.uint8, mode="r", offset=kinds_offset, shape=(count,)) \
+                if flags & FLAG_ACCESS_KINDS else None
+        else:
+            if sys.byteorder != "little":
+                raise ValueError("Reading binary traces without NumPy needs a little-endian host")
+            with open(path, "rb") as file:
+                self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(self.mmap)
+            self.addresses = view[BINARY_HEADER.size:kinds_offset].cast(ADDRESS_TYPECODES[width])
+            self.kinds = view[kinds_offset:kinds_offset + count] if flags & FLAG_ACCESS_KINDS else None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, item):
+        return self.addresses[item]
+
+    def chunks(self, chunk_size=DEFAULT_CHUNK_SIZE, start=0):
+        for position in range(start, self.count, chunk_size):
+            yield self.addresses[position:position + chunk_size]
+
+    def close(self):
+        self.addresses = self.kinds = None
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                pass  # Chunks are still referenced; the map is unmapped once they are released
+            self.mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BinaryTraceWriter:
+    """Stream addresses (and optionally access kinds) into a binary trace file.
+
+    The access count in the header is patched on close(), and kinds are spooled to a
+    temporary file until then, so arbitrarily long traces are written in one pass.
+    """
+
+    def __init__(self, path, address_width=8, with_kinds=False):
+        if address_width not in ADDRESS_TYPECODES:
+            raise ValueError(f"Unsupported address width: {address_width}")
+        self.path = path
+        self.address_width = address_width
+        self.with_kinds = with_kinds
+        self.limit = 1 << (8 * address_width)
+        self.count = 0
+        self.file = open(path, "wb")
+        self.file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, address_width, 0, 0))
+        self.kinds = tempfile.TemporaryFile() if with_kinds else None
+
+    def write(self, addresses, kinds=None):
+        """Append a chunk of addresses; ``kinds`` is required when the writer stores them."""
+        if self.with_kinds and kinds is None:
+            raise ValueError("This trace stores access kinds, pass kinds with every chunk")
+        if np is not None:
+            chunk = np.asarray(addresses)
+            if len(chunk) and (chunk.min() < 0 or chunk.max() >= self.limit):
+                raise ValueError(f"Address does not fit in {self.address_width} bytes")
+            data = chunk.astype(f"<u{self.address_width}").tobytes()
+        else:
+            try:
+                chunk = array(ADDRESS_TYPECODES[self.address_width], addresses)
+            except OverflowError:
+                raise ValueError(f"Address does not fit in {self.address_width} bytes")
+            if sys.byteorder != "little":
+                chunk.byteswap()
+            data = chunk.tobytes()
+        self.file.write(data)
+        self.count += len(data) // self.address_width
+        if self.with_kinds:
+            self.kinds.write(np.asarray(kinds, dtype=np.uint8).tobytes() if np is not None
+                             else array("B", kinds).tobytes())
+
+    def close(self):
+        if self.file is None:
+            return
+        flags = 0
+        if self.with_kinds:
+            flags |= FLAG_ACCESS_KINDS
+            self.kinds.seek(0)
+            while True:
+                block = self.kinds.read(1 << 20)
+                if not block:
+                    break
+                self.file.write(block)
+            self.kinds.close()
+        self.file.seek(0)
+        self.file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, self.address_width, flags, self.count))
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def convert_trace(source, path, trace_format="auto", address_width=8, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Convert a text or ``din`` trace into a binary trace and return the number of accesses.
+
+    ``din`` labels are kept as access kinds. ``source`` may also be an iterable or chunk
+    stream of addresses, e.g. a workloads.Workload.
+    """
+    if trace_format == "auto" and isinstance(source, (str, bytes, os.PathLike)):
+        trace_format = detect_format(source)
+    if trace_format == "binary":
+        raise ValueError(f"Already a binary trace: {source}")
+    if trace_format == "din":
+        with open_text(source) as lines, BinaryTraceWriter(path, address_width, with_kinds=True) as writer:
+            records = iter_din(lines)
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                writer.write([address for _, address in chunk], [label for label, _ in chunk])
+            return writer.count
+    with BinaryTraceWriter(path, address_width) as writer:
+        for chunk in iter_chunks(source, chunk_size, trace_format):
+            writer.write(chunk)
+        return writer.count
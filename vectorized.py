@@ -0,0 +1,101 @@
+"""NumPy batch kernels that reproduce CacheSimulator results for whole arrays of addresses.
+
+CacheSimulator.access_memory_address() stays the reference implementation; these kernels
+must agree with it access for access.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+INVALID_TAG = -1
+
+BatchResult = namedtuple("BatchResult", ["hit_mask", "hits", "misses", "evictions"])
+
+
+class DirectMappedKernel:
+    """Direct-mapped cache state as a flat array of line contents, updated one batch at a time.
+
+    Within a batch, an access hits exactly when the previous access to the same index
+    was to the same block, so sorting the batch by index (stably, to keep program order)
+    turns hit detection into a shifted comparison of neighbouring block numbers. Lines
+    hold block numbers rather than tags, which saves splitting every address into both.
+    """
+
+    def __init__(self, index_bits, offset_bits, cache=None):
+        self.index_bits = index_bits
+        self.offset_bits = offset_bits
+        self.index_mask = (1 << index_bits) - 1
+        self.line_blocks = np.full(1 << index_bits, INVALID_TAG, dtype=np.int64)
+        if cache:
+            lines = np.fromiter(cache.keys(), dtype=np.int64, count=len(cache))
+            tags = np.fromiter(cache.values(), dtype=np.int64, count=len(cache))
+            self.line_blocks[lines] = tags << index_bits | lines
+        # Distinct line indices written by the last batch
+        self.changed_lines = np.zeros(0, dtype=np.int64)
+
+    def line_tags(self, lines):
+        """Return the tags held by an array of (valid) line indices."""
+        return self.line_blocks[lines] >> self.index_bits
+
+    def valid_lines(self):
+        return np.flatnonzero(self.line_blocks != INVALID_TAG)
+
+    def sort_order(self, indices):
+        """Stable argsort of line indices.
+
+        NumPy only radix-sorts 16-bit keys, so wider indices are sorted in 16-bit digits,
+        least significant first, which keeps the sort linear and stable.
+        """
+        if self.index_bits > 32:
+            return np.argsort(indices, kind="stable")
+        order = np.argsort((indices & 0xFFFF).astype(np.uint16), kind="stable")
+        if self.index_bits > 16:
+            high = (indices[order] >> 16).astype(np.uint16)
+            order = order[np.argsort(high, kind="stable")]
+        return order
+
+    def access(self, addresses, hit_mask=True):
+        """Simulate a batch of addresses and return a BatchResult with the per-access hit mask.
+
+        With ``hit_mask`` false only the counters are computed and the mask is None, which
+        saves scattering the outcomes back into program order.
+        """
+        blocks = np.asarray(addresses, dtype=np.int64) >> self.offset_bits
+        count = len(blocks)
+        if count == 0:
+            return BatchResult(np.zeros(0, dtype=bool) if hit_mask else None, 0, 0, 0)
+
+        if self.index_bits <= 16:
+            # Narrow indices sort in a single radix pass and gather at a quarter of the width
+            indices = (blocks & self.index_mask).astype(np.uint16)
+            order = np.argsort(indices, kind="stable")
+        else:
+            indices = blocks & self.index_mask
+            order = self.sort_order(indices)
+        sorted_indices = indices[order]
+        sorted_blocks = blocks[order]
+
+        first = np.empty(count, dtype=bool)
+        first[0] = True
+        np.not_equal(sorted_indices[1:], sorted_indices[:-1], out=first[1:])
+        previous_blocks = np.empty_like(sorted_blocks)
+        previous_blocks[1:] = sorted_blocks[:-1]
+        stored = self.line_blocks[sorted_indices[first]]
+        previous_blocks[first] = stored
+
+        sorted_hits = sorted_blocks == previous_blocks
+        hits = int(np.count_nonzero(sorted_hits))
+        # Every miss evicts, except a first access that finds its line empty
+        evictions = count - hits - int(np.count_nonzero(stored == INVALID_TAG))
+
+        last = np.empty(count, dtype=bool)
+        last[-1] = True
+        last[:-1] = first[1:]
+        self.changed_lines = sorted_indices[last].astype(np.int64)
+        self.line_blocks[self.changed_lines] = sorted_blocks[last]
+
+        mask = None
+        if hit_mask:
+            mask = np.empty(count, dtype=bool)
+            mask[order] = sorted_hits
+        return BatchResult(mask, hits, count - hits, evictions)
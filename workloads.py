@@ -0,0 +1,163 @@
+"""Synthetic memory access workloads, generated with NumPy in chunks.
+
+A Workload is a seedable stream of ``count`` byte addresses in ``[0, memory_size)``.
+It is never held in memory as a whole: chunks() yields int64 arrays, so a workload of any
+length can be passed straight to CacheSimulator.run_trace(), sweeps, hierarchies or
+traces.convert_trace(). Random workloads only draw doubles from the generator, so the same
+seed gives the same addresses whatever the chunk size.
+"""
+from math import isqrt
+
+from traces import DEFAULT_CHUNK_SIZE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WORKLOADS = ("sequential", "strided", "uniform", "zipfian", "phases", "loop-nest")
+
+# Bytes per element of the synthetic data structures (one word)
+WORD_SIZE = 4
+
+
+def sequential(positions, memory_size, rng, step=WORD_SIZE):
+    """Walk memory word by word from address 0, wrapping around at the end."""
+    return positions * step % memory_size
+
+
+def strided(positions, memory_size, rng, stride=4096):
+    """Jump ``stride`` bytes at a time; each lap of memory starts one word further on."""
+    laps = max(1, memory_size // stride)
+    return (positions % laps * stride + positions // laps * WORD_SIZE) % memory_size
+
+
+def uniform(positions, memory_size, rng):
+    """Uniformly random word-aligned addresses."""
+    words = max(1, memory_size // WORD_SIZE)
+    return (rng.random(len(positions)) * words).astype(np.int64) * WORD_SIZE
+
+
+class Zipfian:
+    """Words drawn from a hot set of ``footprint`` words with Zipf-distributed popularity.
+
+    The hot words are scattered over memory, so popular words are not all adjacent.
+    """
+
+    def __init__(self, memory_size, rng, exponent=1.0, footprint=1 << 16):
+        words = max(1, memory_size // WORD_SIZE)
+        footprint = max(1, min(footprint, words))
+        weights = 1 / np.arange(1, footprint + 1, dtype=np.float64) ** exponent
+        self.cumulative = np.cumsum(weights) / weights.sum()
+        self.placement = rng.choice(words, footprint, replace=False) * WORD_SIZE
+
+    def __call__(self, positions, memory_size, rng):
+        ranks = np.searchsorted(self.cumulative, rng.random(len(positions)), side="right")
+        return self.placement[np.minimum(ranks, len(self.placement) - 1)]
+
+
+class Phases:
+    """Uniform accesses to a working set of ``working_set`` bytes that moves every ``phase_length`` accesses."""
+
+    def __init__(self, memory_size, rng, working_set=1 << 16, phase_length=1 << 16):
+        if phase_length <= 0:
+            raise ValueError("Phase length must be positive!")
+        self.working_set = max(WORD_SIZE, min(working_set, memory_size))
+        self.phase_length = phase_length
+        self.base = 0
+
+    def __call__(self, positions, memory_size, rng):
+        words = self.working_set // WORD_SIZE
+        regions = max(1, memory_size // self.working_set)
+        chunk = np.empty(len(positions), dtype=np.int64)
+        done = 0
+        while done < len(positions):
+            position = int(positions[done])
+            if position % self.phase_length == 0:
+                # A new phase picks the working set's region before drawing any address in it
+                self.base = int(rng.random() * regions) * self.working_set
+            stop = min(len(positions), done + self.phase_length - position % self.phase_length)
+            chunk[done:stop] = self.base + (rng.random(stop - done) * words).astype(np.int64) * WORD_SIZE
+            done = stop
+        return chunk
+
+
+def loop_nest(positions, memory_size, rng, size=None):
+    """Repeated ``C[i][j] += A[i][k] * B[k][j]`` over row-major ``size`` x ``size`` word matrices.
+
+    A is read along rows, B down columns and C stays put in the inner loop: the classic
+    mix of sequential, strided and temporal reuse. ``size`` defaults to the largest matrices,
+    up to 64 x 64, that fit in memory three times.
+    """
+    if size is None:
+        size = max(1, min(64, isqrt(memory_size // (3 * WORD_SIZE))))
+    matrix = size * size * WORD_SIZE
+    if 3 * matrix > memory_size:
+        raise ValueError(f"Three {size}x{size} matrices do not fit in {memory_size} bytes!")
+    iteration, operand = positions // 3, positions % 3
+    k = iteration % size
+    j = iteration // size % size
+    i = iteration // (size * size) % size
+    row = np.where(operand == 1, k, i)
+    column = np.where(operand == 0, k, j)
+    return operand * matrix + (row * size + column) * WORD_SIZE
+
+
+# Stateless generators are functions of the trace positions; the others are built per stream
+GENERATORS = {
+    "sequential": sequential,
+    "strided": strided,
+    "uniform": uniform,
+    "zipfian": Zipfian,
+    "phases": Phases,
+    "loop-nest": loop_nest,
+}
+
+
+class Workload:
+    """A synthetic trace of ``count`` addresses; ``kwargs`` tune the named generator."""
+
+    def __init__(self, name, count, memory_size, seed=None, **kwargs):
+        if np is None:
+            raise ValueError("Synthetic workloads need NumPy")
+        if name not in GENERATORS:
+            raise ValueError(f"Unknown workload: {name}")
+        if count < 0 or memory_size < WORD_SIZE:
+            raise ValueError("Workloads need a non-negative length and at least one word of memory!")
+        self.name = name
+        self.count = count
+        self.memory_size = memory_size
+        self.seed = seed
+        self.kwargs = kwargs
+
+    def __len__(self):
+        return self.count
+
+    def chunks(self, chunk_size=DEFAULT_CHUNK_SIZE, start=0):
+        """Yield the addresses from position ``start`` on as int64 arrays of at most ``chunk_size``."""
+        rng = np.random.default_rng(self.seed)
+        generator = GENERATORS[self.name]
+        if isinstance(generator, type):
+            generator = generator(self.memory_size, rng, **self.kwargs)
+            kwargs = {}
+        else:
+            kwargs = self.kwargs
+        stateless = generator in (sequential, strided, loop_nest)
+        # Random streams are regenerated from the start and the skipped part dropped
+        position = start if stateless else 0
+        while position < self.count:
+            stop = min(self.count, position + chunk_size)
+            chunk = generator(np.arange(position, stop, dtype=np.int64), self.memory_size, rng, **kwargs)
+            if stop > start:
+                yield chunk[max(0, start - position):]
+            position = stop
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from chunk.tolist()
+
+
+def generate(name, count, memory_size, seed=None, **kwargs):
+    """Return a whole workload as one int64 array (prefer Workload.chunks() for long traces)."""
+    workload = Workload(name, count, memory_size, seed, **kwargs)
+    return np.concatenate(list(workload.chunks())) if count else np.zeros(0, dtype=np.int64)